@@ -0,0 +1,183 @@
+import math
+import numpy as np
+
+class RunningStats:
+    """Count, sum, min and max of a stream of numbers.
+
+    Two instances built over disjoint parts of a stream can be merged into
+    the stats of the whole, so partial results from chunks, days or worker
+    threads combine without revisiting rows.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.minimum = None
+        self.maximum = None
+
+    def add_many(self, values):
+        """Fold an array of values into the stats"""
+        values = np.asarray(values)
+        if not values.size:
+            return
+        low, high = values.min().item(), values.max().item()
+        self.count += int(values.size)
+        self.total += values.sum().item()
+        self.minimum = low if self.minimum is None else min(self.minimum, low)
+        self.maximum = high if self.maximum is None else max(self.maximum, high)
+
+    def merge(self, other):
+        """Combine another RunningStats into this one"""
+        if not other.count:
+            return self
+        self.count += other.count
+        self.total += other.total
+        self.minimum = other.minimum if self.minimum is None else min(self.minimum, other.minimum)
+        self.maximum = other.maximum if self.maximum is None else max(self.maximum, other.maximum)
+        return self
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self):
+        return {'count': self.count, 'total': self.total, 'minimum': self.minimum, 'maximum': self.maximum}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.count, stats.total = data['count'], data['total']
+        stats.minimum, stats.maximum = data['minimum'], data['maximum']
+        return stats
+
+class QuantileSketch:
+    """Approximate quantiles of non-negative values in bounded memory.
+
+    Values are counted in logarithmic buckets whose width guarantees every
+    returned quantile is within `relative_accuracy` of a true sample value.
+    The number of buckets grows with the log of the value range, not with
+    the number of values, and sketches merge by adding bucket counts.
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.zero_count = 0
+        self.buckets = {}
+
+    @property
+    def count(self):
+        return self.zero_count + sum(self.buckets.values())
+
+    def add_many(self, values):
+        """Fold an array of values into the sketch; values <= 0 count as zero"""
+        values = np.asarray(values, dtype=np.float64)
+        positive = values[values > 0]
+        self.zero_count += int(values.size - positive.size)
+        if not positive.size:
+            return
+        indexes, counts = np.unique(np.ceil(np.log(positive) / self._log_gamma).astype(np.int64),
+                                    return_counts=True)
+        for index, count in zip(indexes.tolist(), counts.tolist()):
+            self.buckets[index] = self.buckets.get(index, 0) + count
+
+    def merge(self, other):
+        """Combine another sketch with the same accuracy into this one"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different accuracies")
+        self.zero_count += other.zero_count
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        return self
+
+    def quantile(self, q):
+        """Estimate the q-th quantile (0 <= q <= 1); None if the sketch is empty"""
+        total = self.count
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                return 2 * self._gamma ** index / (self._gamma + 1)
+        return 2 * self._gamma ** max(self.buckets) / (self._gamma + 1)
+
+    def to_dict(self):
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'zero_count': self.zero_count,
+            'buckets': {str(index): count for index, count in self.buckets.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['relative_accuracy'])
+        sketch.zero_count = data['zero_count']
+        sketch.buckets = {int(index): count for index, count in data['buckets'].items()}
+        return sketch
+
+class EngagementAggregate:
+    """Mergeable engagement summary for one group of tweets"""
+
+    def __init__(self):
+        self.likes = RunningStats()
+        self.retweets = RunningStats()
+        self.engagement = RunningStats()
+        self.sketch = QuantileSketch()
+
+    def add_many(self, likes, retweets):
+        """Fold parallel arrays of likes and retweets into the aggregate"""
+        likes = np.asarray(likes, dtype=np.int64)
+        retweets = np.asarray(retweets, dtype=np.int64)
+        engagement = likes + retweets
+        self.likes.add_many(likes)
+        self.retweets.add_many(retweets)
+        self.engagement.add_many(engagement)
+        self.sketch.add_many(engagement)
+
+    def merge(self, other):
+        """Combine another EngagementAggregate into this one"""
+        self.likes.merge(other.likes)
+        self.retweets.merge(other.retweets)
+        self.engagement.merge(other.engagement)
+        self.sketch.merge(other.sketch)
+        return self
+
+    @property
+    def count(self):
+        return self.engagement.count
+
+    def to_dict(self):
+        """JSON-serialisable form, for caching partial results"""
+        return {
+            'likes': self.likes.to_dict(),
+            'retweets': self.retweets.to_dict(),
+            'engagement': self.engagement.to_dict(),
+            'sketch': self.sketch.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        aggregate = cls()
+        aggregate.likes = RunningStats.from_dict(data['likes'])
+        aggregate.retweets = RunningStats.from_dict(data['retweets'])
+        aggregate.engagement = RunningStats.from_dict(data['engagement'])
+        aggregate.sketch = QuantileSketch.from_dict(data['sketch'])
+        return aggregate
+
+    def summary(self):
+        """Plain dict of the headline figures"""
+        return {
+            'tweets': self.count,
+            'total_likes': self.likes.total,
+            'total_retweets': self.retweets.total,
+            'total_engagement': self.engagement.total,
+            'avg_engagement': self.engagement.mean,
+            'median_engagement': self.sketch.quantile(0.5),
+            'p90_engagement': self.sketch.quantile(0.9),
+            'max_engagement': self.engagement.maximum,
+        }
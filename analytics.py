@@ -1,15 +1,119 @@
+import json
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import os
+import time
+import heapq
+from collections import deque
 from datetime import datetime, timedelta
 import tweepy
 from database import TweetDatabase
+from archive import TweetArchive
+from aggregates import EngagementAggregate
+from charts import get_chart_cache
 from logger import logger
 import config
 
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+def aggregate_rollups(rollups):
+    """Compute every report metric from columnar daily rollups in one pass
+
+    The rows are binned once into a (day x category) grid of post counts and
+    engagement; totals, per-category and per-weekday figures are then read
+    off that small grid, so the cost is independent of how many breakdowns a
+    report needs. Returns None when there are no rollups.
+    """
+    if not rollups['date']:
+        return None
+    
+    days = np.asarray(rollups['date'], dtype='datetime64[D]')
+    posts = np.asarray(rollups['posts_count'], dtype=np.int64)
+    engagement = (np.asarray(rollups['total_likes'], dtype=np.int64)
+                  + np.asarray(rollups['total_retweets'], dtype=np.int64))
+    category_codes, categories = pd.factorize(np.asarray(rollups['category'], dtype=object),
+                                              use_na_sentinel=False)
+    # Uncategorised rows come back as NaN; report them as None
+    categories = [None if pd.isna(category) else category for category in categories]
+    
+    first_day = days.min()
+    day_codes = (days - first_day).astype(np.int64)
+    n_days = int(day_codes.max()) + 1
+    n_categories = len(categories)
+    
+    # The single pass over the rows
+    cells = day_codes * n_categories + category_codes
+    grid_posts = np.bincount(cells, weights=posts, minlength=n_days * n_categories).reshape(n_days, n_categories)
+    grid_engagement = np.bincount(cells, weights=engagement, minlength=n_days * n_categories).reshape(n_days, n_categories)
+    
+    daily_posts = grid_posts.sum(axis=1)
+    daily_engagement = grid_engagement.sum(axis=1)
+    category_posts = grid_posts.sum(axis=0)
+    category_engagement = grid_engagement.sum(axis=0)
+    
+    total_tweets = int(category_posts.sum())
+    total_engagement = int(category_engagement.sum())
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        category_avg = np.where(category_posts > 0, category_engagement / category_posts, -np.inf)
+    
+    # 1970-01-01 was a Thursday; shift so Monday is 0
+    weekday = (first_day.astype(np.int64) + np.arange(n_days) + 3) % 7
+    weekday_posts = np.bincount(weekday, weights=daily_posts, minlength=7)
+    weekday_engagement = np.bincount(weekday, weights=daily_engagement, minlength=7)
+    
+    day_labels = first_day + np.arange(n_days)
+    active = daily_posts > 0
+    
+    return {
+        'total_tweets': total_tweets,
+        'total_engagement': total_engagement,
+        'avg_engagement': total_engagement / total_tweets if total_tweets else 0.0,
+        'best_category': categories[int(np.argmax(category_avg))],
+        'daily_counts': [(str(day), int(count)) for day, count in zip(day_labels[active], daily_posts[active])],
+        'category_counts': sorted((category, int(count)) for category, count in zip(categories, category_posts)
+                                  if category is not None),
+        'engagement_by_day': [(name, float(weekday_engagement[i] / weekday_posts[i]) if weekday_posts[i] else 0.0)
+                              for i, name in enumerate(DAY_NAMES)],
+    }
+
+def _group_slices(keys, *arrays):
+    """Yield (key, *slices) for each distinct key, slicing the parallel arrays by group
+    
+    The rows are sorted by group once, so every group costs one slice
+    rather than a boolean mask over all rows. Missing keys come back as None.
+    """
+    codes, labels = pd.factorize(np.asarray(keys, dtype=object), use_na_sentinel=False)
+    order = np.argsort(codes, kind='stable')
+    bounds = np.cumsum(np.bincount(codes, minlength=len(labels)))[:-1]
+    split = [np.split(np.asarray(array)[order], bounds) for array in arrays]
+    for i, label in enumerate(labels):
+        yield (None if pd.isna(label) else label, *(parts[i] for parts in split))
+
+def _date_runs(days):
+    """Collapse 'YYYY-MM-DD' strings into [start, end) date ranges of consecutive days"""
+    runs = []
+    for day in sorted(datetime.strptime(day, '%Y-%m-%d').date() for day in days):
+        if runs and runs[-1][1] == day:
+            runs[-1][1] = day + timedelta(days=1)
+        else:
+            runs.append([day, day + timedelta(days=1)])
+    return [tuple(run) for run in runs]
+
+def _rate_limit_wait(error):
+    """Seconds until the rate-limit window of a tweepy.TooManyRequests error resets"""
+    reset = error.response.headers.get('x-rate-limit-reset') if error.response is not None else None
+    if reset:
+        return max(int(reset) - time.time(), 0) + 1
+    return config.RATE_LIMIT_DEFAULT_WAIT
+
 class TwitterAnalytics:
+    # Trailing report windows, in days ending today
+    REPORT_PERIODS = {'daily': 1, 'weekly': 7, 'monthly': 30}
+    
     def __init__(self):
         self.db = TweetDatabase()
+        self.archive = TweetArchive()
         
         # Twitter authentication
         self.client = tweepy.Client(
@@ -24,37 +128,282 @@ class TwitterAnalytics:
         if not os.path.exists('analytics'):
             os.makedirs('analytics')
     
-    def update_engagement_metrics(self):
+    def _call_with_rate_limit(self, func, **kwargs):
+        """Call a Twitter API method, waiting out rate-limit windows instead of failing"""
+        for attempt in range(config.RATE_LIMIT_MAX_RETRIES + 1):
+            try:
+                return func(**kwargs)
+            except tweepy.TooManyRequests as e:
+                if attempt == config.RATE_LIMIT_MAX_RETRIES:
+                    raise
+                wait = _rate_limit_wait(e)
+                logger.warning(f"Rate limited by Twitter API, waiting {wait:.0f}s for the window to reset")
+                time.sleep(wait)
+    
+    def refresh_engagement(self, tweet_ids, wait_on_rate_limit=True):
+        """Fetch metrics for many tweets with multi-ID lookups and store them in bulk
+        
+        Returns (api_calls, updated_rows). With wait_on_rate_limit=False a
+        429 is not waited out: metrics fetched so far are stored and
+        tweepy.TooManyRequests is raised to the caller, with the IDs of the
+        batches already looked up in its `refreshed_ids` attribute.
+        """
+        tweet_ids = [str(tweet_id) for tweet_id in tweet_ids]
+        batch_size = config.TWEET_LOOKUP_BATCH_SIZE
+        updates = []
+        api_calls = 0
+        
+        for i in range(0, len(tweet_ids), batch_size):
+            batch = tweet_ids[i:i + batch_size]
+            try:
+                if wait_on_rate_limit:
+                    response = self._call_with_rate_limit(
+                        self.client.get_tweets,
+                        ids=batch,
+                        tweet_fields=['public_metrics']
+                    )
+                else:
+                    response = self.client.get_tweets(ids=batch, tweet_fields=['public_metrics'])
+            except tweepy.TooManyRequests as e:
+                if updates:
+                    self.db.update_engagement_many(updates)
+                e.refreshed_ids = tweet_ids[:i]
+                raise
+            api_calls += 1
+            
+            for tweet in (response.data or []) if response else []:
+                metrics = tweet.public_metrics
+                updates.append((str(tweet.id), metrics.get('like_count', 0), metrics.get('retweet_count', 0)))
+        
+        # Write all metrics in one transaction
+        updated = self.db.update_engagement_many(updates)
+        logger.info(f"Fetched engagement for {len(tweet_ids)} tweets in {api_calls} API calls, "
+                    f"{updated} rows updated")
+        return api_calls, updated
+    
+    def update_engagement_metrics(self, limit=20):
         """Fetch and update engagement metrics for recent tweets"""
         try:
             # Get recent tweets from database
-            recent_tweets = self.db.get_tweet_history(limit=20)
+            recent_tweets = self.db.get_tweet_history(limit=limit)
+            _, updated = self.refresh_engagement([tweet['tweet_id'] for tweet in recent_tweets])
+            logger.info(f"Engagement metrics updated for {updated} tweets")
             
-            for tweet in recent_tweets:
-                tweet_id = tweet['tweet_id']
-                
-                # Get tweet metrics from Twitter API
-                response = self.client.get_tweet(
-                    id=tweet_id,
-                    tweet_fields=['public_metrics']
-                )
+        except Exception as e:
+            logger.error(f"Error updating engagement metrics: {e}")
+    
+    def load_archived_history(self, start=None, end=None, columns=None, dataset='tweets'):
+        """Load archived tweets (or engagement history) for [start, end)
+        
+        Only the month partitions overlapping the window are read, memory-mapped
+        and limited to `columns`. Run `python bot.py export` to refresh the archive.
+        """
+        return self.archive.read(dataset, start, end, columns)
+    
+    def iter_archived_history(self, start=None, end=None, columns=None, dataset='tweets'):
+        """Yield archived history one month at a time to keep memory flat"""
+        return self.archive.iter_partitions(dataset, start, end, columns)
+    
+    def aggregate_history(self, start=None, end=None, group_by='category'):
+        """Stream tweets posted in [start, end) into mergeable per-group aggregates
+        
+        `group_by` is 'category', 'quarter' or None for a single overall
+        group. Tweets are read in chunks and folded into
+        EngagementAggregates, so memory grows with the number of groups,
+        not the number of tweets. Returns {group: EngagementAggregate}.
+        """
+        if group_by not in ('category', 'quarter', None):
+            raise ValueError(f"Unknown grouping: {group_by}")
+        
+        groups = {}
+        columns = ['category', 'post_time', 'engagement_likes', 'engagement_retweets']
+        # Quarter keys come from post_time, so rows without one can't be placed
+        chunks = self.db.iter_tweet_chunks(start, end, columns=columns, ordered=False,
+                                           timed=group_by == 'quarter')
+        for chunk in chunks:
+            likes = np.asarray(chunk['engagement_likes'], dtype=np.int64)
+            retweets = np.asarray(chunk['engagement_retweets'], dtype=np.int64)
+            
+            if group_by is None:
+                groups.setdefault(None, EngagementAggregate()).add_many(likes, retweets)
+                continue
+            
+            if group_by == 'category':
+                keys = chunk['category']
+            else:
+                keys = [f"{post_time[:4]}-Q{(int(post_time[5:7]) - 1) // 3 + 1}" for post_time in chunk['post_time']]
+            for key, group_likes, group_retweets in _group_slices(keys, likes, retweets):
+                groups.setdefault(key, EngagementAggregate()).add_many(group_likes, group_retweets)
+        
+        return groups
+    
+    def generate_history_report(self, title, group_by='category', start=None, end=None):
+        """Summarise tweets in [start, end) per group from a single streaming pass"""
+        try:
+            groups = self.aggregate_history(start, end, group_by)
+            return self._format_report(title, groups)
+            
+        except Exception as e:
+            logger.error(f"Error generating history report: {e}")
+            return f"Error generating history report: {str(e)}"
+    
+    def load_day_partials(self, start, end):
+        """Per-day, per-category aggregates for the dates in [start, end)
+        
+        Each day's partial is cached in the database together with the
+        revision of that day's rollups it was built from. Only days whose
+        revision has moved on are re-read from the tweets table.
+        Returns {'YYYY-MM-DD': {category: EngagementAggregate}}.
+        """
+        # Read revisions before scanning so a concurrent write makes the new partial stale
+        revisions = self.db.get_daily_revisions(start, end)
+        cached = self.db.get_report_partials(start, end)
+        partials = {}
+        stale = []
+        
+        for day, revision in revisions.items():
+            entry = cached.get(day)
+            if entry and entry[0] == revision:
+                partials[day] = {category or None: EngagementAggregate.from_dict(data)
+                                 for category, data in json.loads(entry[1]).items()}
+            else:
+                stale.append(day)
+        
+        if stale:
+            fresh = self._compute_day_partials(stale)
+            self.db.save_report_partials(
+                (day, revisions[day],
+                 json.dumps({category or '': aggregate.to_dict() for category, aggregate in fresh[day].items()}))
+                for day in stale)
+            partials.update(fresh)
+        
+        logger.info(f"Loaded {len(partials)} day partials ({len(stale)} recomputed)")
+        return partials
+    
+    def _compute_day_partials(self, days):
+        """Aggregate the given days' tweets, scanning each run of consecutive days once"""
+        partials = {day: {} for day in days}
+        columns = ['category', 'post_time', 'engagement_likes', 'engagement_retweets']
+        
+        for run_start, run_end in _date_runs(days):
+            for chunk in self.db.iter_tweet_chunks(run_start, run_end, columns=columns, ordered=False):
+                day_keys = [post_time[:10] for post_time in chunk['post_time']]
+                likes = np.asarray(chunk['engagement_likes'], dtype=np.int64)
+                retweets = np.asarray(chunk['engagement_retweets'], dtype=np.int64)
+                categories = np.asarray(chunk['category'], dtype=object)
                 
-                if response and response.data:
-                    metrics = response.data.public_metrics
-                    likes = metrics.get('like_count', 0)
-                    retweets = metrics.get('retweet_count', 0)
-                    
-                    # Update database
-                    self.db.update_engagement(tweet_id, likes, retweets)
-                    logger.info(f"Updated engagement for tweet {tweet_id}: {likes} likes, {retweets} retweets")
+                for day, day_categories, day_likes, day_retweets in _group_slices(day_keys, categories, likes, retweets):
+                    for category, group_likes, group_retweets in _group_slices(day_categories, day_likes, day_retweets):
+                        partials[day].setdefault(category, EngagementAggregate()).add_many(group_likes, group_retweets)
+        
+        return partials
+    
+    def generate_period_report(self, period='weekly', start=None, end=None):
+        """Report on the dates [start, end), or on a trailing period ending today
+        
+        `period` is one of REPORT_PERIODS and is only used when no explicit
+        window is given. The report merges cached per-day partials, so a
+        monthly report combines ~30 day partials instead of rescanning tweets.
+        """
+        try:
+            if start is None or end is None:
+                if period not in self.REPORT_PERIODS:
+                    raise ValueError(f"Unknown report period: {period}")
+                end = datetime.now().date() + timedelta(days=1)
+                start = end - timedelta(days=self.REPORT_PERIODS[period])
+                title = f"📊 {period.capitalize()} Twitter Performance Report"
+            else:
+                title = "📊 Twitter Performance Report"
+            title += f" ({start} to {end - timedelta(days=1)})"
             
-            logger.info(f"Engagement metrics updated for {len(recent_tweets)} tweets")
+            groups = {}
+            best_day = None
+            for day, day_groups in sorted(self.load_day_partials(start, end).items()):
+                day_total = EngagementAggregate()
+                for category, aggregate in day_groups.items():
+                    groups.setdefault(category, EngagementAggregate()).merge(aggregate)
+                    day_total.merge(aggregate)
+                if day_total.count and (best_day is None or day_total.engagement.mean > best_day[1]):
+                    best_day = (day, day_total.engagement.mean, day_total.count)
+            
+            extra = []
+            if best_day:
+                extra.append(f"• Best day: {best_day[0]} (avg {best_day[1]:.2f} engagement over {best_day[2]} tweets)")
+            return self._format_report(title, groups, extra)
             
         except Exception as e:
-            logger.error(f"Error updating engagement metrics: {e}")
+            logger.error(f"Error generating {period} report: {e}")
+            return f"Error generating {period} report: {str(e)}"
+    
+    def _format_report(self, title, groups, extra=()):
+        """Format per-group aggregates with an overall line on top"""
+        groups = {key: aggregate for key, aggregate in groups.items() if aggregate.count}
+        if not groups:
+            return f"{title}\n\nNo tweets available for analysis."
+        
+        overall = EngagementAggregate()
+        for aggregate in groups.values():
+            overall.merge(aggregate)
+        
+        lines = [title, "", self._format_aggregate("Overall", overall.summary()), *extra, ""]
+        for key in sorted(groups, key=lambda k: (k is None, k or '')):
+            lines.append(self._format_aggregate(key or "uncategorized", groups[key].summary()))
+        
+        logger.info(f"{title} generated from {overall.count} tweets")
+        return "\n".join(lines)
+    
+    def generate_lifetime_report(self):
+        """Per-category performance over the whole tweet history"""
+        return self.generate_history_report("📊 Lifetime Twitter Performance Report", group_by='category')
+    
+    def generate_quarterly_report(self, start=None, end=None):
+        """Performance per calendar quarter"""
+        return self.generate_history_report("📊 Quarterly Twitter Performance Report", group_by='quarter',
+                                            start=start, end=end)
+    
+    @staticmethod
+    def _format_aggregate(label, summary):
+        return (f"• {label}: {summary['tweets']} tweets, {summary['total_engagement']} engagement "
+                f"(avg {summary['avg_engagement']:.2f}, median ~{summary['median_engagement']:.0f}, "
+                f"p90 ~{summary['p90_engagement']:.0f}, max {summary['max_engagement']})")
     
-    def generate_category_report(self):
-        """Generate performance report by category"""
+    def best_posting_hours(self, category, weekday, count):
+        """Pick up to `count` hours (0-23) to post `category` on `weekday` (0 = Monday)
+        
+        Hours are scored by average engagement in the trigger-maintained
+        hour-of-week matrix, shrunk toward the category average so an hour
+        with one lucky post doesn't win. Only hours that have been tried
+        are candidates and picks are ADAPTIVE_SCHEDULE_MIN_GAP_HOURS apart.
+        Returns [] until the category has ADAPTIVE_SCHEDULE_MIN_POSTS posts.
+        """
+        posts = np.zeros(168)
+        engagement = np.zeros(168)
+        for row in self.db.get_posting_slots(category):
+            posts[row['hour_of_week']] = row['posts_count']
+            engagement[row['hour_of_week']] = row['total_likes'] + row['total_retweets']
+        
+        if posts.sum() < config.ADAPTIVE_SCHEDULE_MIN_POSTS:
+            return []
+        
+        prior = engagement.sum() / posts.sum()
+        weight = config.ADAPTIVE_SCHEDULE_PRIOR_POSTS
+        day_posts = posts[weekday * 24:(weekday + 1) * 24]
+        day_engagement = engagement[weekday * 24:(weekday + 1) * 24]
+        scores = (day_engagement + prior * weight) / (day_posts + weight)
+        
+        chosen = []
+        for hour in np.argsort(-scores, kind='stable').tolist():
+            if len(chosen) == count:
+                break
+            if day_posts[hour] and all(abs(hour - other) >= config.ADAPTIVE_SCHEDULE_MIN_GAP_HOURS for other in chosen):
+                chosen.append(hour)
+        return sorted(chosen)
+    
+    def generate_category_report(self, wait=True):
+        """Generate performance report by category
+        
+        Returns the chart filename, or a Future of it when `wait` is False.
+        """
         try:
             # Get stats by category
             category_stats = self.db.get_category_stats()
@@ -66,22 +415,19 @@ class TwitterAnalytics:
             # Convert to DataFrame for easier manipulation
             df = pd.DataFrame(category_stats)
             
-            # Generate bar chart
-            plt.figure(figsize=(10, 6))
-            plt.bar(df['category'], df['avg_engagement'], color='skyblue')
-            plt.xlabel('Category')
-            plt.ylabel('Average Engagement (Likes + Retweets)')
-            plt.title('Tweet Performance by Category')
-            plt.xticks(rotation=45)
-            plt.tight_layout()
+            # Render bar chart off-thread (reused if the stats haven't changed)
+            future = get_chart_cache().render({
+                'kind': 'bar',
+                'labels': df['category'].tolist(),
+                'values': df['avg_engagement'].tolist(),
+                'color': 'skyblue',
+                'xlabel': 'Category',
+                'ylabel': 'Average Engagement (Likes + Retweets)',
+                'title': 'Tweet Performance by Category',
+                'rotate_labels': 45,
+            }, 'analytics', 'category_performance')
             
-            # Save chart
-            timestamp = datetime.now().strftime("%Y%m%d")
-            filename = f'analytics/category_performance_{timestamp}.png'
-            plt.savefig(filename)
-            plt.close()
-            
-            return filename
+            return future.result() if wait else future
             
         except Exception as e:
             logger.error(f"Error generating category report: {e}")
@@ -93,40 +439,29 @@ class TwitterAnalytics:
             # Update engagement metrics
             self.update_engagement_metrics()
             
-            # Get recent tweets
-            recent_tweets = self.db.get_tweet_history(limit=30)
-            
-            if not recent_tweets:
+            if not self.db.get_tweet_history(limit=1):
                 logger.warning("No tweets available for weekly report")
                 return "No tweets available for analysis this week."
             
-            # Convert to DataFrame
-            df = pd.DataFrame(recent_tweets)
-            
-            # Convert post_time to datetime
-            df['post_time'] = pd.to_datetime(df['post_time'])
+            # Load the last 7 days of daily rollups (one row per day and category)
+            today = datetime.now().date()
+            start = today - timedelta(days=6)
+            end = today + timedelta(days=1)
+            summary = aggregate_rollups(self.db.get_daily_rollups(start, end, columnar=True))
             
-            # Filter last 7 days
-            one_week_ago = datetime.now() - timedelta(days=7)
-            df_week = df[df['post_time'] > one_week_ago]
-            
-            if df_week.empty:
+            if summary is None:
                 logger.warning("No tweets in the last 7 days for weekly report")
                 return "No tweets posted in the last 7 days."
             
-            # Calculate total engagement
-            df_week['total_engagement'] = df_week['engagement_likes'] + df_week['engagement_retweets']
-            
-            # Generate charts
-            self._generate_weekly_charts(df_week)
+            # Start rendering charts while the summary is built
+            chart_futures = self._generate_weekly_charts(summary)
             
             # Generate text summary
-            total_tweets = len(df_week)
-            total_engagement = df_week['total_engagement'].sum()
-            avg_engagement = df_week['total_engagement'].mean()
-            best_category = df_week.groupby('category')['total_engagement'].mean().idxmax()
-            best_tweet_idx = df_week['total_engagement'].idxmax()
-            best_tweet = df_week.loc[best_tweet_idx]
+            total_tweets = summary['total_tweets']
+            total_engagement = summary['total_engagement']
+            avg_engagement = summary['avg_engagement']
+            best_category = summary['best_category']
+            best_tweet = self.db.get_top_tweets(start, end, limit=1)[0]
             
             report = (
                 f"📊 Weekly Twitter Performance Report\n\n"
@@ -139,6 +474,12 @@ class TwitterAnalytics:
                 f"See analytics folder for detailed charts."
             )
             
+            for future in chart_futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.error(f"Error rendering weekly chart: {e}")
+            
             logger.info("Weekly report generated successfully")
             return report
             
@@ -146,49 +487,163 @@ class TwitterAnalytics:
             logger.error(f"Error generating weekly report: {e}")
             return f"Error generating weekly report: {str(e)}"
     
-    def _generate_weekly_charts(self, df_week):
-        """Generate charts for weekly report"""
+    def _generate_weekly_charts(self, summary):
+        """Submit the weekly report charts for rendering; returns their futures"""
         try:
-            timestamp = datetime.now().strftime("%Y%m%d")
+            cache = get_chart_cache()
+            futures = []
             
             # Chart 1: Daily tweet count
-            plt.figure(figsize=(10, 6))
-            df_week['date'] = df_week['post_time'].dt.date
-            daily_counts = df_week.groupby('date').size()
-            daily_counts.plot(kind='bar', color='skyblue')
-            plt.xlabel('Date')
-            plt.ylabel('Number of Tweets')
-            plt.title('Tweets Posted per Day')
-            plt.xticks(rotation=45)
-            plt.tight_layout()
-            plt.savefig(f'analytics/daily_tweet_count_{timestamp}.png')
-            plt.close()
+            futures.append(cache.render({
+                'kind': 'bar',
+                'labels': [day for day, _ in summary['daily_counts']],
+                'values': [count for _, count in summary['daily_counts']],
+                'color': 'skyblue',
+                'xlabel': 'Date',
+                'ylabel': 'Number of Tweets',
+                'title': 'Tweets Posted per Day',
+                'rotate_labels': 45,
+            }, 'analytics', 'daily_tweet_count'))
             
             # Chart 2: Category distribution
-            plt.figure(figsize=(10, 6))
-            category_counts = df_week['category'].value_counts()
-            category_counts.plot(kind='pie', autopct='%1.1f%%')
-            plt.title('Tweet Category Distribution')
-            plt.axis('equal')
-            plt.tight_layout()
-            plt.savefig(f'analytics/category_distribution_{timestamp}.png')
-            plt.close()
+            futures.append(cache.render({
+                'kind': 'pie',
+                'labels': [category for category, _ in summary['category_counts']],
+                'values': [count for _, count in summary['category_counts']],
+                'title': 'Tweet Category Distribution',
+            }, 'analytics', 'category_distribution'))
             
             # Chart 3: Engagement by day of week
-            plt.figure(figsize=(10, 6))
-            df_week['day_of_week'] = df_week['post_time'].dt.day_name()
-            day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-            engagement_by_day = df_week.groupby('day_of_week')['total_engagement'].mean().reindex(day_order)
-            engagement_by_day.plot(kind='bar', color='lightgreen')
-            plt.xlabel('Day of Week')
-            plt.ylabel('Average Engagement')
-            plt.title('Engagement by Day of Week')
-            plt.xticks(rotation=45)
-            plt.tight_layout()
-            plt.savefig(f'analytics/engagement_by_day_{timestamp}.png')
-            plt.close()
-            
-            logger.info("Weekly charts generated successfully")
+            futures.append(cache.render({
+                'kind': 'bar',
+                'labels': [day for day, _ in summary['engagement_by_day']],
+                'values': [value for _, value in summary['engagement_by_day']],
+                'color': 'lightgreen',
+                'xlabel': 'Day of Week',
+                'ylabel': 'Average Engagement',
+                'title': 'Engagement by Day of Week',
+                'rotate_labels': 45,
+            }, 'analytics', 'engagement_by_day'))
+            
+            logger.info("Weekly charts submitted for rendering")
+            return futures
             
         except Exception as e:
-            logger.error(f"Error generating weekly charts: {e}") 
\ No newline at end of file
+            logger.error(f"Error generating weekly charts: {e}")
+            return []
+
+
+class EngagementRefreshPlanner:
+    """Keep engagement metrics fresh within a Twitter API call budget.
+    
+    Each tracked tweet sits in a priority queue keyed by when it is next due.
+    The refresh interval starts at ENGAGEMENT_REFRESH_MIN_INTERVAL_MINUTES and
+    doubles every ENGAGEMENT_REFRESH_DECAY_HOURS of tweet age, so new tweets
+    are refreshed often and old ones rarely. Tweets older than
+    ENGAGEMENT_REFRESH_MAX_AGE_DAYS are dropped. At most
+    ENGAGEMENT_REFRESH_BUDGET lookup calls are made per 15-minute window.
+    """
+    
+    WINDOW = timedelta(minutes=15)
+    
+    def __init__(self, analytics, budget=None):
+        self.analytics = analytics
+        self.db = analytics.db
+        self.budget = budget or config.ENGAGEMENT_REFRESH_BUDGET
+        self.min_interval = timedelta(minutes=config.ENGAGEMENT_REFRESH_MIN_INTERVAL_MINUTES)
+        self.max_interval = timedelta(days=config.ENGAGEMENT_REFRESH_MAX_INTERVAL_DAYS)
+        self.decay = timedelta(hours=config.ENGAGEMENT_REFRESH_DECAY_HOURS)
+        self.max_age = timedelta(days=config.ENGAGEMENT_REFRESH_MAX_AGE_DAYS)
+        
+        self._queue = []        # (due_time, -post_timestamp, tweet_id); ties favour younger tweets
+        self._post_times = {}   # tweet_id -> post_time
+        self._last_row_id = None
+        self._calls = deque()   # times of API calls inside the current window
+    
+    def refresh_interval(self, age):
+        """How long to wait between refreshes for a tweet of this age"""
+        interval = self.min_interval * 2 ** (max(age, timedelta(0)) / self.decay)
+        return min(interval, self.max_interval)
+    
+    def sync(self, now=None):
+        """Start tracking tweets added since the last sync"""
+        now = now or datetime.now()
+        rows = self.db.get_tweets_between(
+            now - self.max_age, now + timedelta(days=1),
+            columns=['id', 'tweet_id', 'post_time'], after_id=self._last_row_id
+        )
+        if not rows:
+            return 0
+        
+        self._last_row_id = max([row['id'] for row in rows] + [self._last_row_id or 0])
+        new_rows = [row for row in rows if row['tweet_id'] and row['tweet_id'] not in self._post_times]
+        last_seen = self.db.get_last_snapshot_times(
+            [row['tweet_id'] for row in new_rows if row['tweet_id'].isdigit()])
+        
+        for row in new_rows:
+            tweet_id = row['tweet_id']
+            post_time = datetime.fromisoformat(row['post_time'])
+            self._post_times[tweet_id] = post_time
+            
+            # Never-measured tweets are due now; others one interval after their last snapshot
+            due = now
+            if tweet_id in last_seen:
+                due = last_seen[tweet_id] + self.refresh_interval(last_seen[tweet_id] - post_time)
+            heapq.heappush(self._queue, (due, -post_time.timestamp(), tweet_id))
+        
+        return len(new_rows)
+    
+    def calls_available(self, now=None):
+        """API calls left in the current 15-minute window"""
+        now = now or datetime.now()
+        while self._calls and self._calls[0] <= now - self.WINDOW:
+            self._calls.popleft()
+        return max(self.budget - len(self._calls), 0)
+    
+    def run_once(self, now=None):
+        """Refresh the most overdue tweets the budget allows; returns tweets refreshed"""
+        now = now or datetime.now()
+        self.sync(now)
+        
+        capacity = self.calls_available(now) * config.TWEET_LOOKUP_BATCH_SIZE
+        due = []
+        while self._queue and self._queue[0][0] <= now and len(due) < capacity:
+            _, _, tweet_id = heapq.heappop(self._queue)
+            if now - self._post_times[tweet_id] > self.max_age:
+                del self._post_times[tweet_id]
+                continue
+            due.append(tweet_id)
+        
+        if not due:
+            return 0
+        
+        refreshed = set(due)
+        try:
+            # Never sleep through a rate-limit window here: this runs on the
+            # scheduler thread, in front of every posting job
+            api_calls, _ = self.analytics.refresh_engagement(due, wait_on_rate_limit=False)
+            self._calls.extend([now] * api_calls)
+            retry = None
+        except tweepy.TooManyRequests as e:
+            retry = now + timedelta(seconds=_rate_limit_wait(e))
+            logger.warning(f"Refresh planner rate limited, pausing until {retry:%H:%M:%S}")
+            # Spend the whole budget until the window resets
+            self._calls = deque([retry - self.WINDOW] * self.budget)
+            # Batches looked up before the 429 were stored; only the rest wait for the reset
+            refreshed = set(getattr(e, 'refreshed_ids', ()))
+        except Exception as e:
+            logger.error(f"Error refreshing engagement for {len(due)} tweets: {e}")
+            retry = now + self.min_interval
+            refreshed = set()
+        
+        for tweet_id in due:
+            post_time = self._post_times[tweet_id]
+            if tweet_id in refreshed:
+                next_due = now + self.refresh_interval(now - post_time)
+            else:
+                next_due = retry
+            heapq.heappush(self._queue, (next_due, -post_time.timestamp(), tweet_id))
+        
+        logger.info(f"Refresh planner: {len(refreshed)} of {len(due)} due tweets refreshed, "
+                    f"{len(self._queue)} tracked, {self.calls_available(now)} calls left in window")
+        return len(refreshed)
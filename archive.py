@@ -0,0 +1,157 @@
+import json
+import os
+from datetime import date, datetime
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from logger import logger
+import config
+
+# Archive datasets and the timestamp column each one is partitioned by
+DATASETS = {
+    'tweets': 'post_time',
+    'engagement': 'observed_at',
+}
+
+def _month_bounds(month):
+    """Return the [start, end) datetimes of a 'YYYY-MM' partition"""
+    year, mon = map(int, month.split('-'))
+    start = datetime(year, mon, 1)
+    end = datetime(year + 1, 1, 1) if mon == 12 else datetime(year, mon + 1, 1)
+    return start, end
+
+def _as_datetime(value):
+    """Treat a date window bound as midnight of that day"""
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day)
+    return value
+
+class TweetArchive:
+    """Month-partitioned, compressed Parquet archive of the tweet history.
+
+    Layout: <directory>/<dataset>/<YYYY-MM>.parquet plus a manifest.json
+    holding the signature each partition was written from, so exports only
+    rewrite months whose data changed.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or config.ARCHIVE_DIR
+        self.manifest_path = os.path.join(self.directory, 'manifest.json')
+
+    def _partition_path(self, dataset, month):
+        return os.path.join(self.directory, dataset, f'{month}.parquet')
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {dataset: {} for dataset in DATASETS}
+        with open(self.manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        for dataset in DATASETS:
+            manifest.setdefault(dataset, {})
+        return manifest
+
+    def _save_manifest(self, manifest):
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _read_month(self, db, dataset, month):
+        """Load one month from the database as a DataFrame"""
+        start, end = _month_bounds(month)
+        if dataset == 'tweets':
+            df = pd.DataFrame(db.get_tweets_between(start, end, columnar=True))
+            # isoformat() drops the fraction when microseconds are 0, so a
+            # month can mix precisions; don't let pandas infer one format
+            df['post_time'] = pd.to_datetime(df['post_time'], format='ISO8601')
+        else:
+            df = pd.DataFrame(db.get_engagement_snapshots_between(start, end, columnar=True))
+            # Local wall-clock time, matching post_time and get_engagement_curves
+            df['observed_at'] = pd.to_datetime(df['observed_at'].map(datetime.fromtimestamp))
+        return df
+
+    def export(self, db):
+        """Write new or changed month partitions; returns the number written"""
+        manifest = self._load_manifest()
+        signatures = db.get_monthly_signatures()
+        written = 0
+
+        for dataset in DATASETS:
+            os.makedirs(os.path.join(self.directory, dataset), exist_ok=True)
+            current = {month: list(signature) for month, signature in signatures[dataset].items()}
+            exported = manifest[dataset]
+
+            for month, signature in sorted(current.items()):
+                path = self._partition_path(dataset, month)
+                if exported.get(month) == signature and os.path.exists(path):
+                    continue
+
+                df = self._read_month(db, dataset, month)
+                tmp_path = path + '.tmp'
+                df.to_parquet(tmp_path, compression=config.ARCHIVE_COMPRESSION, index=False)
+                os.replace(tmp_path, path)
+                exported[month] = signature
+                written += 1
+                logger.info(f"Exported {dataset} partition {month} ({len(df)} rows)")
+
+            # Months that no longer have any rows
+            for month in set(exported) - set(current):
+                path = self._partition_path(dataset, month)
+                if os.path.exists(path):
+                    os.remove(path)
+                del exported[month]
+
+        self._save_manifest(manifest)
+        logger.info(f"Archive export complete: {written} partitions written")
+        return written
+
+    def partitions(self, dataset='tweets', start=None, end=None):
+        """List the partition files overlapping [start, end), oldest first"""
+        start, end = _as_datetime(start), _as_datetime(end)
+        directory = os.path.join(self.directory, dataset)
+        if not os.path.isdir(directory):
+            return []
+
+        paths = []
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith('.parquet'):
+                continue
+            month_start, month_end = _month_bounds(name[:-len('.parquet')])
+            if (start and month_end <= start) or (end and month_start >= end):
+                continue
+            paths.append(os.path.join(directory, name))
+        return paths
+
+    def iter_partitions(self, dataset='tweets', start=None, end=None, columns=None):
+        """Lazily yield one DataFrame per month overlapping [start, end)
+
+        Files are memory-mapped and only the requested columns are decoded;
+        rows outside the window are dropped from the edge months.
+        """
+        start, end = _as_datetime(start), _as_datetime(end)
+        time_column = DATASETS[dataset]
+        read_columns = None
+        if columns:
+            read_columns = list(dict.fromkeys(list(columns) + [time_column]))
+
+        for path in self.partitions(dataset, start, end):
+            table = pq.read_table(path, columns=read_columns, memory_map=True)
+            if start or end:
+                times = table.column(time_column)
+                mask = None
+                if start:
+                    mask = pc.greater_equal(times, pa.scalar(start, times.type))
+                if end:
+                    before_end = pc.less(times, pa.scalar(end, times.type))
+                    mask = before_end if mask is None else pc.and_(mask, before_end)
+                table = table.filter(mask)
+            df = table.to_pandas()
+            yield df[list(columns)] if columns else df
+
+    def read(self, dataset='tweets', start=None, end=None, columns=None):
+        """Read the partitions overlapping [start, end) into one DataFrame"""
+        frames = list(self.iter_partitions(dataset, start, end, columns))
+        if not frames:
+            return pd.DataFrame(columns=list(columns) if columns else None)
+        return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,285 @@
+"""Synthetic-load benchmarks for the bot's hot paths.
+
+Usage:
+    python benchmark.py --output db_results.json db --sizes 10000 100000 1000000
+    python benchmark.py sentiment --sizes 1000 10000 100000
+
+Results are emitted as JSON (one record per size/operation/mode) so runs can
+be diffed to catch regressions or used to size hosts.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from database import TweetDatabase
+
+CATEGORIES = ['tech', 'ai', 'programming', 'cybersecurity', 'ml', 'code_tip', 'interview', 'sentiment']
+
+def _summarize(name, mode, size, latencies, elapsed, benchmark='db'):
+    """Build a result record from per-call latencies (seconds)"""
+    latencies = sorted(latencies)
+    return {
+        'benchmark': benchmark,
+        'operation': name,
+        'mode': mode,
+        'history_size': size,
+        'ops': len(latencies),
+        'seconds': round(elapsed, 4),
+        'ops_per_sec': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(statistics.median(latencies) * 1000, 3),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 3),
+        'max_ms': round(latencies[-1] * 1000, 3),
+    }
+
+def _time_calls(func, args_iter):
+    """Call func once per argument tuple, returning (latencies, elapsed)"""
+    latencies = []
+    start = time.perf_counter()
+    for args in args_iter:
+        t = time.perf_counter()
+        func(*args)
+        latencies.append(time.perf_counter() - t)
+    return latencies, time.perf_counter() - start
+
+def generate_history(db, size, seed=0, years=3):
+    """Fill the database with `size` synthetic tweets spread over the past `years`"""
+    rng = random.Random(seed)
+    now = datetime.now()
+    span = timedelta(days=365 * years).total_seconds()
+    batch = []
+
+    for i in range(size):
+        post_time = now - timedelta(seconds=rng.random() * span)
+        batch.append((str(10**17 + i), f"Synthetic tweet {i} about {rng.choice(CATEGORIES)}",
+                      rng.choice(CATEGORIES), post_time, None))
+        if len(batch) == 50000:
+            db.add_tweets_many(batch)
+            batch = []
+    if batch:
+        db.add_tweets_many(batch)
+
+    db.update_engagement_many(
+        (str(10**17 + i), rng.randint(0, 500), rng.randint(0, 100)) for i in range(size))
+
+def bench_single_threaded(db, size, ops, rng):
+    """Time each TweetDatabase operation on its own"""
+    results = []
+    next_id = 2 * 10**17
+
+    latencies, elapsed = _time_calls(db.add_tweet, (
+        (str(next_id + i), f"Benchmark tweet {next_id + i}", rng.choice(CATEGORIES)) for i in range(ops)))
+    results.append(_summarize('add_tweet', 'single', size, latencies, elapsed))
+
+    latencies, elapsed = _time_calls(db.update_engagement, (
+        (str(10**17 + rng.randrange(size)), rng.randint(0, 500), rng.randint(0, 100)) for _ in range(ops)))
+    results.append(_summarize('update_engagement', 'single', size, latencies, elapsed))
+
+    latencies, elapsed = _time_calls(db.get_tweet_history, ((30,) for _ in range(ops)))
+    results.append(_summarize('get_tweet_history', 'single', size, latencies, elapsed))
+
+    latencies, elapsed = _time_calls(db.get_category_stats, (() for _ in range(ops)))
+    results.append(_summarize('get_category_stats', 'single', size, latencies, elapsed))
+
+    return results
+
+def bench_concurrent(db, size, duration, rng):
+    """Run a scheduler-like writer and a report-like reader side by side"""
+    stop = threading.Event()
+    latencies = {'add_tweet': [], 'update_engagement': [], 'get_tweet_history': [], 'get_category_stats': []}
+    next_id = 3 * 10**17
+
+    def scheduler():
+        i = 0
+        while not stop.is_set():
+            t = time.perf_counter()
+            db.add_tweet(str(next_id + i), f"Concurrent tweet {next_id + i}", 'tech')
+            latencies['add_tweet'].append(time.perf_counter() - t)
+            t = time.perf_counter()
+            db.update_engagement(str(10**17 + (i * 7919) % size), i % 500, i % 100)
+            latencies['update_engagement'].append(time.perf_counter() - t)
+            i += 1
+
+    def report():
+        while not stop.is_set():
+            t = time.perf_counter()
+            db.get_tweet_history(limit=30)
+            latencies['get_tweet_history'].append(time.perf_counter() - t)
+            t = time.perf_counter()
+            db.get_category_stats()
+            latencies['get_category_stats'].append(time.perf_counter() - t)
+
+    threads = [threading.Thread(target=scheduler), threading.Thread(target=report)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    return [_summarize(name, 'concurrent', size, values, elapsed)
+            for name, values in latencies.items() if values]
+
+def run_db_benchmarks(sizes, ops, duration, seed=0):
+    """Benchmark TweetDatabase against synthetic histories of each size"""
+    results = []
+    for size in sizes:
+        workdir = tempfile.mkdtemp(prefix='tweetdb_bench_')
+        try:
+            db = TweetDatabase(os.path.join(workdir, 'bench.db'))
+            start = time.perf_counter()
+            generate_history(db, size, seed)
+            print(f"Generated {size} tweets in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+            rng = random.Random(seed)
+            results.extend(bench_single_threaded(db, size, ops, rng))
+            results.extend(bench_concurrent(db, size, duration, rng))
+            db.close()
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+# Filler words for synthetic tweets, mixed with sentiment lexicon words
+FILLER_WORDS = ['the', 'a', 'is', 'to', 'and', 'of', 'in', 'it', 'this', 'that', 'for', 'on', 'with',
+                'new', 'just', 'today', 'python', 'model', 'release', 'data', 'team', 'update', 'really',
+                'very', 'not', 'never', 'so', 'more', 'people', 'think', 'about', 'week', 'launch']
+
+def generate_clean_tweets(size, seed=0):
+    """Synthetic cleaned tweet texts (lowercase words only), 8-30 words each"""
+    from lexicon import get_scorer
+    rng = random.Random(seed)
+    lexicon_words = sorted(word for word in get_scorer().words if word.isalpha())
+    texts = []
+    for _ in range(size):
+        words = [rng.choice(lexicon_words) if rng.random() < 0.2 else rng.choice(FILLER_WORDS)
+                 for _ in range(rng.randint(8, 30))]
+        texts.append(' '.join(words))
+    return texts
+
+def _throughput(name, mode, size, elapsed, benchmark):
+    """Build a result record for a batch operation over `size` tweets"""
+    return {
+        'benchmark': benchmark,
+        'operation': name,
+        'mode': mode,
+        'sample_size': size,
+        'seconds': round(elapsed, 4),
+        'tweets_per_sec': round(size / elapsed, 1) if elapsed else None,
+    }
+
+def generate_raw_tweets(size, seed=0):
+    """Synthetic raw tweets with mentions, hashtags, URLs, punctuation and mixed case"""
+    rng = random.Random(seed)
+    decorations = [
+        lambda w: w.capitalize(),
+        lambda w: f"@{w}_{rng.randint(1, 999)}",
+        lambda w: f"#{w.capitalize()}",
+        lambda w: f"{w}{rng.choice(['!', '!!', '...', ',', '?', ':)'])}",
+        lambda w: f"https://t.co/{w[:4]}{rng.randint(1000, 9999)}",
+        lambda w: f"{w}'s",
+    ]
+    tweets = []
+    for text in generate_clean_tweets(size, seed):
+        words = [rng.choice(decorations)(word) if rng.random() < 0.25 else word for word in text.split()]
+        tweets.append(' '.join(words))
+    return tweets
+
+def run_sentiment_benchmarks(sizes, baseline_limit, seed=0, workers=()):
+    """Compare per-tweet cleaning and TextBlob scoring with the batch paths"""
+    from textblob import TextBlob
+    from lexicon import get_scorer, ScoringPool
+    from sentiment import SentimentAnalyzer
+    analyzer = SentimentAnalyzer()
+    scorer = get_scorer()
+    # Always shard, so pool overhead shows up at small sizes too
+    pools = {count: ScoringPool(count, threshold=0) for count in workers}
+    for count, pool in pools.items():
+        pool.score_many(['warm up'] * count * pool.chunk_size)
+    results = []
+
+    for size in sizes:
+        raw = generate_raw_tweets(size, seed)
+
+        start = time.perf_counter()
+        for text in raw:
+            analyzer.clean_text(text)
+        results.append(_throughput('clean', 'per_tweet', size, time.perf_counter() - start, 'sentiment'))
+
+        start = time.perf_counter()
+        texts = analyzer.clean_texts(raw)
+        results.append(_throughput('clean', 'batch', size, time.perf_counter() - start, 'sentiment'))
+
+        start = time.perf_counter()
+        scorer.score_many(texts)
+        results.append(_throughput('score', 'lexicon', size, time.perf_counter() - start, 'sentiment'))
+
+        if size <= baseline_limit:
+            # The previous per-tweet path: one TextBlob, .sentiment read twice
+            start = time.perf_counter()
+            for text in texts:
+                blob = TextBlob(text)
+                blob.sentiment.polarity, blob.sentiment.subjectivity
+            results.append(_throughput('score', 'textblob', size, time.perf_counter() - start, 'sentiment'))
+
+        for count, pool in pools.items():
+            start = time.perf_counter()
+            pool.score_many(texts)
+            results.append(_throughput('score', f'pool_{count}', size, time.perf_counter() - start, 'sentiment'))
+        print(f"Cleaned and scored {size} tweets", file=sys.stderr)
+
+    for pool in pools.values():
+        pool.shutdown()
+    return results
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Benchmarks for the Twitter bot')
+    parser.add_argument('--output', help='Write JSON results to this file instead of stdout')
+    subparsers = parser.add_subparsers(dest='suite', required=True)
+
+    db_parser = subparsers.add_parser('db', help='TweetDatabase under synthetic load')
+    db_parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+                           help='Synthetic history sizes to test')
+    db_parser.add_argument('--ops', type=int, default=500, help='Calls per single-threaded operation')
+    db_parser.add_argument('--duration', type=float, default=5.0,
+                           help='Seconds to run the concurrent scheduler + report workload')
+    db_parser.add_argument('--seed', type=int, default=0)
+
+    sentiment_parser = subparsers.add_parser('sentiment', help='Tweet cleaning and sentiment scoring throughput')
+    sentiment_parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                                  help='Sample sizes (tweets) to score')
+    sentiment_parser.add_argument('--baseline-limit', type=int, default=10000,
+                                  help='Largest sample to also score with per-tweet TextBlob')
+    sentiment_parser.add_argument('--workers', type=int, nargs='*', default=[],
+                                  help='Scoring pool sizes to compare with in-process scoring')
+    sentiment_parser.add_argument('--seed', type=int, default=0)
+
+    return parser.parse_args()
+
+def main():
+    """Run the selected benchmark suite and emit JSON results"""
+    args = parse_args()
+
+    if args.suite == 'db':
+        results = run_db_benchmarks(args.sizes, args.ops, args.duration, args.seed)
+    elif args.suite == 'sentiment':
+        results = run_sentiment_benchmarks(args.sizes, args.baseline_limit, args.seed, args.workers)
+
+    output = json.dumps({'generated_at': datetime.now().isoformat(), 'results': results}, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
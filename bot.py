@@ -4,16 +4,19 @@ import time
 import random
 import tweepy
 import feedparser
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # Internal modules
 import config
 from logger import logger
 from database import TweetDatabase
+from persistence import WriteBehindWriter
 from content_generator import ContentGenerator
 from sentiment import SentimentAnalyzer
 from scheduler import TweetScheduler
-from analytics import TwitterAnalytics
+from analytics import TwitterAnalytics, EngagementRefreshPlanner
+from archive import TweetArchive
+from charts import get_chart_cache, shutdown_renderer
 
 class TwitterBot:
     def __init__(self):
@@ -30,22 +33,24 @@ class TwitterBot:
         
         # Initialize helper modules
         self.db = TweetDatabase()
+        self.writer = WriteBehindWriter(self.db)
         self.content_generator = ContentGenerator()
-        self.sentiment_analyzer = SentimentAnalyzer()
+        self.sentiment_analyzer = SentimentAnalyzer(db=self.db)
         self.analytics = TwitterAnalytics()
+        self.refresh_planner = EngagementRefreshPlanner(self.analytics)
         
         # Initialize scheduler (pass self to allow scheduling bot methods)
         self.scheduler = TweetScheduler(self)
         
         logger.info("Twitter Bot initialized successfully")
     
-    def fetch_news(self, category='tech'):
-        """Fetch latest news from RSS feed based on category"""
+    def fetch_news_article(self, category='tech'):
+        """Fetch a not-yet-posted article from the RSS feed, returning (text, link)"""
         logger.info(f"Fetching {category} news")
         
         if category not in config.NEWS_SOURCES:
             logger.error(f"Invalid news category: {category}")
-            return None
+            return None, None
         
         feed_url = config.NEWS_SOURCES[category]
         feed = feedparser.parse(feed_url)
@@ -53,10 +58,16 @@ class TwitterBot:
         
         if not entries:
             logger.warning(f"No entries found in {category} feed")
-            return None
+            return None, None
+        
+        # Get random article from the 5 most recent we haven't posted yet
+        candidates = [entry for entry in entries[:5]
+                      if not self.db.is_duplicate(entry.title, entry.link)]
+        if not candidates:
+            logger.warning(f"All recent {category} articles have already been posted")
+            return None, None
         
-        # Get random article from the 5 most recent
-        article = random.choice(entries[:5])
+        article = random.choice(candidates)
         title = article.title
         link = article.link
         
@@ -64,18 +75,42 @@ class TwitterBot:
         hashtags = ' '.join(random.sample(config.HASHTAGS.get(category, []), 
                                           min(2, len(config.HASHTAGS.get(category, [])))))
         
-        return f"{title} {link} {hashtags}"
+        return f"{title} {link} {hashtags}", link
+    
+    def fetch_news(self, category='tech'):
+        """Fetch latest news from RSS feed based on category"""
+        text, _ = self.fetch_news_article(category)
+        return text
+    
+    def _fit_length(self, text):
+        """Truncate text to the maximum tweet length"""
+        if len(text) > config.MAX_TWEET_LENGTH:
+            logger.warning(f"Tweet exceeds maximum length ({len(text)} characters)")
+            text = text[:config.MAX_TWEET_LENGTH - 3] + "..."
+        return text
     
-    def post_tweet(self, text, category='general'):
+    def _generate_unique(self, generate):
+        """Call a content generator until it returns something we haven't posted"""
+        for _ in range(config.DUPLICATE_REROLL_ATTEMPTS):
+            text = generate()
+            if text and not self.db.is_duplicate(self._fit_length(text)):
+                return text
+            logger.info("Generated content was already posted, re-rolling")
+        return None
+    
+    def post_tweet(self, text, category='general', source_url=None):
         """Post a tweet and log it to the database"""
         if not text:
             logger.warning("Cannot post empty tweet")
             return None
         
         # Check tweet length
-        if len(text) > config.MAX_TWEET_LENGTH:
-            logger.warning(f"Tweet exceeds maximum length ({len(text)} characters)")
-            text = text[:config.MAX_TWEET_LENGTH - 3] + "..."
+        text = self._fit_length(text)
+        
+        # Reject content we've already posted
+        if self.db.is_duplicate(text, source_url, category):
+            logger.warning("Skipping duplicate tweet")
+            return None
         
         try:
             # Post tweet using Twitter API v2
@@ -83,8 +118,8 @@ class TwitterBot:
             tweet_id = response.data['id']
             logger.info(f"Tweet posted successfully! ID: {tweet_id}")
             
-            # Save to database
-            self.db.add_tweet(tweet_id, text, category)
+            # Save to database in the background
+            self.writer.enqueue(tweet_id, text, category, source_url=source_url)
             
             return tweet_id
         
@@ -95,10 +130,10 @@ class TwitterBot:
     def post_news(self, category='tech'):
         """Post a news tweet"""
         logger.info(f"Posting {category} news")
-        news_text = self.fetch_news(category)
+        news_text, link = self.fetch_news_article(category)
         
         if news_text:
-            return self.post_tweet(news_text, category=category)
+            return self.post_tweet(news_text, category=category, source_url=link)
         else:
             logger.warning(f"No news content to post for {category}")
             return None
@@ -106,19 +141,19 @@ class TwitterBot:
     def post_ml_snippet(self):
         """Post an ML code snippet"""
         logger.info("Posting ML snippet")
-        ml_snippet = self.content_generator.generate_ml_snippet()
+        ml_snippet = self._generate_unique(self.content_generator.generate_ml_snippet)
         return self.post_tweet(ml_snippet, category='ml')
     
     def post_code_tip(self):
         """Post a coding tip"""
         logger.info("Posting code tip")
-        code_tip = self.content_generator.generate_code_tip()
+        code_tip = self._generate_unique(self.content_generator.generate_code_tip)
         return self.post_tweet(code_tip, category='code_tip')
     
     def post_interview_question(self):
         """Post an interview question"""
         logger.info("Posting interview question")
-        question = self.content_generator.generate_interview_question()
+        question = self._generate_unique(self.content_generator.generate_interview_question)
         return self.post_tweet(question, category='interview')
     
     def post_sentiment_analysis(self):
@@ -131,17 +166,21 @@ class TwitterBot:
             logger.warning("No trending topics found")
             return None
         
-        # Choose a random topic
-        topic = random.choice(topics)
-        logger.info(f"Selected trending topic: {topic}")
-        
-        # Analyze sentiment
-        sentiment_text, chart_path = self.sentiment_analyzer.analyze_topic_sentiment(topic)
+        if config.SENTIMENT_MULTI_TOPIC:
+            # Analyze every topic concurrently and keep the best one
+            topic, sentiment_text, chart_path = self.sentiment_analyzer.analyze_trending_topics(topics)
+        else:
+            # Choose a random topic
+            topic = random.choice(topics)
+            logger.info(f"Selected trending topic: {topic}")
+            
+            # Analyze sentiment
+            sentiment_text, chart_path = self.sentiment_analyzer.analyze_topic_sentiment(topic)
         
         if sentiment_text:
             return self.post_tweet(sentiment_text, category='sentiment')
         else:
-            logger.warning(f"Could not generate sentiment analysis for {topic}")
+            logger.warning(f"Could not generate sentiment analysis for {topic or 'any trending topic'}")
             return None
     
     def generate_weekly_report(self):
@@ -158,6 +197,43 @@ class TwitterBot:
         
         return report
     
+    def generate_report(self, period='weekly', start=None, end=None):
+        """Generate a daily/weekly/monthly/quarterly/lifetime or custom-window report"""
+        logger.info(f"Generating {period} analytics report")
+        if period == 'lifetime':
+            report = self.analytics.generate_lifetime_report()
+        elif period == 'quarterly':
+            report = self.analytics.generate_quarterly_report(start, end)
+        else:
+            report = self.analytics.generate_period_report(period, start, end)
+        
+        logger.info(report)
+        return report
+    
+    def refresh_engagement(self):
+        """Refresh engagement metrics for the tweets that are due"""
+        try:
+            return self.refresh_planner.run_once()
+        except Exception as e:
+            logger.error(f"Error running engagement refresh planner: {e}")
+            return 0
+    
+    def export_archive(self):
+        """Export tweet and engagement history to the columnar archive"""
+        logger.info("Exporting tweet history archive")
+        return TweetArchive().export(self.db)
+    
+    def run_maintenance(self):
+        """Run periodic database and chart cache housekeeping"""
+        logger.info("Running database maintenance")
+        try:
+            removed = self.db.compact_engagement_snapshots()
+            logger.info(f"Downsampled engagement history: {removed} snapshots removed")
+            get_chart_cache().evict()
+            self.sentiment_analyzer.cache.evict()
+        except Exception as e:
+            logger.error(f"Error running database maintenance: {e}")
+    
     def start_scheduler(self):
         """Start the tweet scheduler"""
         logger.info("Starting tweet scheduler")
@@ -167,17 +243,29 @@ class TwitterBot:
         """Stop the tweet scheduler"""
         logger.info("Stopping tweet scheduler")
         self.scheduler.stop()
+        self.writer.close()
+        self.sentiment_analyzer.close()
+        shutdown_renderer()
 
 def parse_args():
     """Parse command line arguments"""
     parser = argparse.ArgumentParser(description='Twitter Bot for CS and Tech content')
-    parser.add_argument('action', choices=['run', 'post', 'schedule', 'report', 'test'], 
+    parser.add_argument('action', choices=['run', 'post', 'schedule', 'report', 'export', 'rebuild-rollups', 'test'], 
                         help='Action to perform')
     parser.add_argument('--type', choices=['news', 'ml', 'code_tip', 'interview', 'sentiment'],
                         help='Type of content to post')
     parser.add_argument('--category', help='News category to use', default='tech')
+    parser.add_argument('--period', choices=['daily', 'weekly', 'monthly', 'quarterly', 'lifetime'],
+                        help='Report period (default: the weekly report with charts)')
+    parser.add_argument('--start', type=lambda s: datetime.strptime(s, '%Y-%m-%d').date(),
+                        help='First day of a custom report window (YYYY-MM-DD)')
+    parser.add_argument('--end', type=lambda s: datetime.strptime(s, '%Y-%m-%d').date(),
+                        help='Last day of a custom report window, inclusive (YYYY-MM-DD)')
     
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.period == 'lifetime' and (args.start or args.end):
+        parser.error("--start/--end cannot be combined with --period lifetime")
+    return args
 
 def main():
     """Main entry point for the bot"""
@@ -220,7 +308,23 @@ def main():
     
     elif args.action == 'report':
         # Generate analytics report
-        bot.generate_weekly_report()
+        if args.start or args.end:
+            start = args.start or datetime(1970, 1, 1).date()
+            end = (args.end or datetime.now().date()) + timedelta(days=1)
+            bot.generate_report(args.period or 'custom', start, end)
+        elif args.period:
+            bot.generate_report(args.period)
+        else:
+            bot.generate_weekly_report()
+    
+    elif args.action == 'export':
+        # Incrementally export history to month-partitioned Parquet files
+        bot.export_archive()
+    
+    elif args.action == 'rebuild-rollups':
+        # Backfill the daily analytics rollups from the tweets table
+        rows = bot.db.rebuild_rollups()
+        logger.info(f"Rebuilt analytics rollups: {rows} day/category rows")
     
     elif args.action == 'test':
         # Run a test of each functionality
@@ -228,6 +332,11 @@ def main():
         bot.post_news()
         bot.post_ml_snippet()
         bot.post_sentiment_analysis()
+    
+    # Make sure queued tweet records reach the database before exiting
+    bot.writer.close()
+    bot.sentiment_analyzer.close()
+    shutdown_renderer()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,220 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from logger import logger
+import config
+
+def render_chart(spec, path):
+    """Render a chart spec to a PNG file using the object-oriented Figure API
+
+    `spec` is a plain dict so it can be shipped to worker processes:
+        kind            'bar', 'pie' or 'hist'
+        labels, values  category labels and heights (bar/pie) or samples (hist)
+        title, xlabel, ylabel, color, rotate_labels, figsize
+        bins, alpha, mean_line, annotations  (hist only)
+    Returns the path written.
+    """
+    fig = Figure(figsize=spec.get('figsize', (10, 6)))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    kind = spec['kind']
+
+    if kind == 'bar':
+        positions = range(len(spec['values']))
+        ax.bar(positions, spec['values'], color=spec.get('color', 'skyblue'))
+        ax.set_xticks(list(positions))
+        ax.set_xticklabels([str(label) for label in spec['labels']],
+                           rotation=spec.get('rotate_labels', 0),
+                           ha='right' if spec.get('rotate_labels') else 'center')
+    elif kind == 'pie':
+        ax.pie(spec['values'], labels=spec['labels'], autopct='%1.1f%%')
+        ax.axis('equal')
+    elif kind == 'hist':
+        values = spec['values']
+        ax.hist(values, bins=spec.get('bins', 20), color=spec.get('color', 'blue'), alpha=spec.get('alpha', 0.7))
+        if spec.get('mean_line') and values:
+            ax.axvline(x=sum(values) / len(values), color='red', linestyle='--', linewidth=2)
+        for text, xy in spec.get('annotations', []):
+            ax.annotate(text, xy=xy, xycoords='axes fraction')
+    else:
+        raise ValueError(f"Unknown chart kind: {kind}")
+
+    ax.set_title(spec.get('title', ''))
+    if spec.get('xlabel'):
+        ax.set_xlabel(spec['xlabel'])
+    if spec.get('ylabel'):
+        ax.set_ylabel(spec['ylabel'])
+
+    fig.tight_layout()
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Write then rename so readers (and the chart cache) never see a partial file
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    fig.savefig(tmp_path, format='png')
+    os.replace(tmp_path, path)
+    return path
+
+class ChartRenderer:
+    """Render independent charts in parallel worker processes.
+
+    submit() returns a Future resolving to the written path, so callers can
+    build the rest of a report while PNGs are encoded. Workers are started
+    lazily with the 'spawn' method, which is safe alongside the scheduler and
+    write-behind threads. With use_processes=False charts render inline.
+    """
+
+    def __init__(self, max_workers=None, use_processes=True):
+        self.max_workers = max_workers or config.CHART_RENDER_WORKERS
+        self.use_processes = use_processes
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def submit(self, spec, path):
+        """Queue a chart for rendering; returns a Future of its path"""
+        if self.use_processes:
+            try:
+                return self._get_executor().submit(render_chart, spec, path)
+            except Exception as e:
+                logger.warning(f"Chart worker pool unavailable, rendering inline: {e}")
+
+        future = Future()
+        try:
+            future.set_result(render_chart(spec, path))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait=True):
+        """Stop the worker processes"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+# Bump when render_chart's output changes so cached PNGs are re-rendered
+CHART_STYLE_VERSION = 1
+
+def chart_key(spec):
+    """Content hash of a chart spec (its data and presentation)"""
+    payload = json.dumps({'version': CHART_STYLE_VERSION, 'spec': spec}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class ChartCache:
+    """Content-addressed chart files with size- and age-based eviction.
+
+    Charts are stored as <directory>/<prefix>_<hash>.png, where the hash
+    covers the spec's data and styling. If the file already exists it is
+    reused (and its mtime refreshed) instead of being re-rendered.
+    """
+
+    def __init__(self, renderer=None, max_bytes=None, max_age_days=None, directories=None):
+        self.renderer = renderer or get_renderer()
+        self.max_bytes = max_bytes or config.CHART_CACHE_MAX_BYTES
+        self.max_age_days = max_age_days or config.CHART_CACHE_MAX_AGE_DAYS
+        self.directories = directories or config.CHART_CACHE_DIRS
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def path_for(self, spec, directory, prefix):
+        """The file a spec is cached under"""
+        return os.path.join(directory, f'{prefix}_{chart_key(spec)[:16]}.png')
+
+    def render(self, spec, directory, prefix):
+        """Return a Future of the chart's path, rendering only on a cache miss"""
+        path = self.path_for(spec, directory, prefix)
+
+        with self._lock:
+            if path in self._pending:
+                return self._pending[path]
+
+            if os.path.exists(path):
+                os.utime(path)
+                future = Future()
+                future.set_result(path)
+                logger.info(f"Chart cache hit: {path}")
+                return future
+
+            future = self.renderer.submit(spec, path)
+            self._pending[path] = future
+
+        future.add_done_callback(lambda _: self._forget(path))
+        return future
+
+    def _forget(self, path):
+        with self._lock:
+            self._pending.pop(path, None)
+
+    def evict(self):
+        """Delete charts older than the age limit, then the oldest until each directory fits its size limit
+
+        Returns the number of files removed.
+        """
+        cutoff = time.time() - self.max_age_days * 86400
+        removed = 0
+
+        for directory in self.directories:
+            if not os.path.isdir(directory):
+                continue
+
+            files = []
+            for name in os.listdir(directory):
+                if not name.endswith('.png'):
+                    continue
+                path = os.path.join(directory, name)
+                stat = os.stat(path)
+                files.append((stat.st_mtime, stat.st_size, path))
+
+            files.sort()
+            total = sum(size for _, size, _ in files)
+            for mtime, size, path in files:
+                if mtime >= cutoff and total <= self.max_bytes:
+                    break
+                os.remove(path)
+                total -= size
+                removed += 1
+
+        logger.info(f"Chart cache eviction removed {removed} files")
+        return removed
+
+_renderer = None
+_cache = None
+_renderer_lock = threading.Lock()
+
+def get_renderer():
+    """Return the process-wide chart renderer shared by analytics and sentiment"""
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = ChartRenderer(use_processes=config.CHART_RENDER_PROCESSES)
+        return _renderer
+
+def get_chart_cache():
+    """Return the process-wide chart cache"""
+    global _cache
+    renderer = get_renderer()
+    with _renderer_lock:
+        if _cache is None:
+            _cache = ChartCache(renderer)
+        return _cache
+
+def shutdown_renderer():
+    """Shut down the shared renderer's worker processes, if started"""
+    with _renderer_lock:
+        if _renderer is not None:
+            _renderer.shutdown()
@@ -21,6 +21,8 @@ NEWS_SOURCES = {
 
 # Tweet settings
 MAX_TWEET_LENGTH = 280
+DUPLICATE_REROLL_ATTEMPTS = 3  # Times to regenerate content that was already posted
+FINGERPRINT_KEEP_HASHTAGS = ['sentiment']  # Categories whose hashtags carry content (the analysed topic)
 HASHTAGS = {
     'tech': ['#TechNews', '#Technology'],
     'ai': ['#AI', '#MachineLearning', '#DataScience'],
@@ -35,8 +37,62 @@ POSTING_SCHEDULE = {
     'sentiment': '18:00'          # Post sentiment analysis at 6 PM
 }
 
+# Adaptive scheduling: pick posting hours from the hour-of-week engagement matrix
+ADAPTIVE_SCHEDULE = False            # False: always use the fixed POSTING_SCHEDULE times
+ADAPTIVE_SCHEDULE_MIN_POSTS = 20     # Category posts needed before its matrix is trusted
+ADAPTIVE_SCHEDULE_PRIOR_POSTS = 5    # Shrink thinly sampled hours toward the category average
+ADAPTIVE_SCHEDULE_MIN_GAP_HOURS = 3  # Minimum spacing between posts of one type on a day
+
+# Sentiment analysis settings
+SENTIMENT_SAMPLE_SIZE = 100     # Tweets sampled per topic; each 100 costs one search request of read quota
+SENTIMENT_PAGE_SIZE = 100       # Tweets per search request (API maximum is 100)
+SENTIMENT_PREFETCH_PAGES = 2    # Pages fetched ahead while the current one is scored
+SENTIMENT_SCORING_PROCESSES = 0       # Worker processes for scoring large batches (0: in-process)
+SENTIMENT_PARALLEL_THRESHOLD = 20000  # Batches smaller than this are always scored in-process
+SENTIMENT_SCORING_CHUNK_SIZE = 5000   # Texts sent to a worker per task
+SENTIMENT_CACHE_MAX_ITEMS = 50000     # Per-tweet scores kept in memory
+SENTIMENT_CACHE_TTL_HOURS = 72        # Cached scores older than this are rescored
+SENTIMENT_MULTI_TOPIC = False         # Analyze all trending topics and post the best (False: one random topic)
+SENTIMENT_TOPICS_DEADLINE = 60        # Seconds allowed for sampling all topics
+SENTIMENT_TOPIC_SELECTION = 'decisive'  # 'decisive' (largest |avg polarity|) or 'largest' (biggest sample)
+SENTIMENT_MIN_SAMPLE_SIZE = 50        # Smaller samples are only chosen when no topic reaches this
+TRENDS_CACHE_TTL_MINUTES = 15         # Trending topics are refetched in the background after this
+TRENDS_TIMEOUT = 10                   # Seconds before a trends request is abandoned
+
+# Twitter API settings
+TWEET_LOOKUP_BATCH_SIZE = 100  # Maximum IDs per multi-tweet lookup
+RATE_LIMIT_MAX_RETRIES = 3     # Rate-limit windows to wait out before giving up
+RATE_LIMIT_DEFAULT_WAIT = 60   # Seconds to wait when no reset header is returned
+
+# Engagement refresh planner settings
+ENGAGEMENT_REFRESH_BUDGET = 10                # Lookup calls allowed per 15-minute window
+ENGAGEMENT_REFRESH_TICK_MINUTES = 5           # How often the scheduler runs the planner
+ENGAGEMENT_REFRESH_MIN_INTERVAL_MINUTES = 15  # Refresh interval for brand-new tweets
+ENGAGEMENT_REFRESH_DECAY_HOURS = 24           # Interval doubles for every this many hours of age
+ENGAGEMENT_REFRESH_MAX_INTERVAL_DAYS = 7
+ENGAGEMENT_REFRESH_MAX_AGE_DAYS = 30          # Stop refreshing tweets older than this
+
+# Chart rendering settings
+CHART_RENDER_PROCESSES = True  # Render charts in worker processes (False: inline)
+CHART_RENDER_WORKERS = 2
+CHART_CACHE_DIRS = ['analytics', 'charts']   # Directories whose PNGs the chart cache manages
+CHART_CACHE_MAX_BYTES = 50 * 1024 * 1024     # Per directory
+CHART_CACHE_MAX_AGE_DAYS = 30
+
 # Database settings
 DB_FILENAME = 'tweet_history.db'
+STREAM_CHUNK_SIZE = 5000  # Rows fetched per chunk by streaming history scans
+
+# Archive export settings
+ARCHIVE_DIR = 'archive'         # Month-partitioned Parquet export of tweet history
+ARCHIVE_COMPRESSION = 'zstd'
+
+# Write-behind persistence settings
+WRITE_BEHIND_SPILL_FILE = 'pending_tweets.jsonl'  # Durable journal of not-yet-committed tweets
+WRITE_BEHIND_QUEUE_SIZE = 1000
+WRITE_BEHIND_BATCH_SIZE = 100
+WRITE_BEHIND_FLUSH_INTERVAL = 1.0                 # Seconds the writer waits for more records
+WRITE_BEHIND_MAX_RETRIES = 3                      # Failed batch writes to retry before leaving them in the spill file
 
 # Logging settings
 LOG_FILENAME = 'bot.log'
@@ -1,105 +1,860 @@
 import sqlite3
-import os
 import datetime
-from config import DB_FILENAME
+import hashlib
+import re
+import threading
+import config
+
+_URL_RE = re.compile(r'https?://\S+|www\.\S+')
+_HASHTAG_RE = re.compile(r'#\w+')
+_WORD_RE = re.compile(r'\w+')
+
+
+def content_fingerprint(text, category=None):
+    """Hash tweet text after normalizing away case, links, hashtags and punctuation
+
+    Hashtags are kept for FINGERPRINT_KEEP_HASHTAGS categories, where they
+    name the subject (a sentiment post's topic). Returns None when nothing
+    meaningful is left to compare.
+    """
+    if not text:
+        return None
+    text = _URL_RE.sub(' ', text.lower())
+    if category not in config.FINGERPRINT_KEEP_HASHTAGS:
+        text = _HASHTAG_RE.sub(' ', text)
+    words = _WORD_RE.findall(text)
+    if not words:
+        return None
+    return hashlib.sha1(' '.join(words).encode('utf-8')).hexdigest()
+
+
+def _dedupe_tweet_ids(conn):
+    """Keep only the first row per tweet_id so a unique index can be built"""
+    conn.execute('''
+    DELETE FROM tweets
+    WHERE tweet_id IS NOT NULL AND id NOT IN (
+        SELECT MIN(id) FROM tweets
+        WHERE tweet_id IS NOT NULL
+        GROUP BY tweet_id
+    )
+    ''')
+
+
+def _backfill_fingerprints(conn):
+    """Fill content_hash/source_url for existing rows, first occurrence wins"""
+    news_categories = set(config.NEWS_SOURCES)
+    seen_hashes, seen_urls = set(), set()
+    updates = []
+
+    for row_id, content, category in conn.execute("SELECT id, content, category FROM tweets ORDER BY id"):
+        content_hash = content_fingerprint(content, category)
+        if content_hash in seen_hashes:
+            content_hash = None
+        seen_hashes.add(content_hash)
+
+        source_url = None
+        if category in news_categories and content:
+            match = _URL_RE.search(content)
+            if match and match.group() not in seen_urls:
+                source_url = match.group()
+                seen_urls.add(source_url)
+
+        updates.append((content_hash, source_url, row_id))
+
+    conn.executemany("UPDATE tweets SET content_hash = ?, source_url = ? WHERE id = ?", updates)
+
+
+# Backfills the per-day, per-category rollups in `analytics` from `tweets`
+_REBUILD_ROLLUPS_SQL = (
+    "DELETE FROM analytics",
+    '''
+    INSERT INTO analytics (date, category, posts_count, total_likes, total_retweets)
+    SELECT date(post_time), COALESCE(category, ''), COUNT(*),
+           SUM(engagement_likes), SUM(engagement_retweets)
+    FROM tweets
+    WHERE post_time IS NOT NULL
+    GROUP BY 1, 2
+    ''',
+)
+
+def _hour_of_week_sql(column):
+    """SQL for the hour of the week (0 = Monday 00h .. 167 = Sunday 23h) of a timestamp column"""
+    return (f"((CAST(strftime('%w', {column}) AS INTEGER) + 6) % 7) * 24"
+            f" + CAST(strftime('%H', {column}) AS INTEGER)")
+
+# Backfills the hour-of-week x category engagement matrix in `posting_slots`
+_REBUILD_POSTING_SLOTS_SQL = (
+    "DELETE FROM posting_slots",
+    f'''
+    INSERT INTO posting_slots (hour_of_week, category, posts_count, total_likes, total_retweets)
+    SELECT {_hour_of_week_sql('post_time')}, COALESCE(category, ''), COUNT(*),
+           SUM(engagement_likes), SUM(engagement_retweets)
+    FROM tweets
+    WHERE post_time IS NOT NULL
+    GROUP BY 1, 2
+    ''',
+)
+
+
+# Schema migrations, applied in order. The index of each entry + 1 is the
+# schema version it produces (stored in PRAGMA user_version). Steps are SQL
+# strings or callables taking the connection. Never edit a released entry;
+# append a new one instead.
+MIGRATIONS = [
+    # 1: initial schema
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS tweets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tweet_id TEXT,
+            content TEXT,
+            category TEXT,
+            post_time TIMESTAMP,
+            engagement_likes INTEGER DEFAULT 0,
+            engagement_retweets INTEGER DEFAULT 0
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS analytics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date DATE,
+            posts_count INTEGER,
+            avg_engagement REAL
+        )
+        ''',
+    ],
+    # 2: indexes for history ordering, engagement updates and category reports
+    [
+        "CREATE INDEX IF NOT EXISTS idx_tweets_post_time ON tweets (post_time)",
+        _dedupe_tweet_ids,
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_tweets_tweet_id ON tweets (tweet_id)",
+        "CREATE INDEX IF NOT EXISTS idx_tweets_category_post_time ON tweets (category, post_time)",
+    ],
+    # 3: turn the unused analytics table into trigger-maintained daily rollups
+    [
+        "DROP TABLE IF EXISTS analytics",
+        '''
+        CREATE TABLE analytics (
+            date DATE NOT NULL,
+            category TEXT NOT NULL,
+            posts_count INTEGER NOT NULL DEFAULT 0,
+            total_likes INTEGER NOT NULL DEFAULT 0,
+            total_retweets INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (date, category)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE TRIGGER tweets_rollup_insert AFTER INSERT ON tweets
+        BEGIN
+            INSERT OR IGNORE INTO analytics (date, category)
+            VALUES (date(NEW.post_time), COALESCE(NEW.category, ''));
+            UPDATE analytics
+            SET posts_count = posts_count + 1,
+                total_likes = total_likes + COALESCE(NEW.engagement_likes, 0),
+                total_retweets = total_retweets + COALESCE(NEW.engagement_retweets, 0)
+            WHERE date = date(NEW.post_time) AND category = COALESCE(NEW.category, '');
+        END
+        ''',
+        '''
+        CREATE TRIGGER tweets_rollup_update
+        AFTER UPDATE OF post_time, category, engagement_likes, engagement_retweets ON tweets
+        BEGIN
+            UPDATE analytics
+            SET posts_count = posts_count - 1,
+                total_likes = total_likes - COALESCE(OLD.engagement_likes, 0),
+                total_retweets = total_retweets - COALESCE(OLD.engagement_retweets, 0)
+            WHERE date = date(OLD.post_time) AND category = COALESCE(OLD.category, '');
+            INSERT OR IGNORE INTO analytics (date, category)
+            VALUES (date(NEW.post_time), COALESCE(NEW.category, ''));
+            UPDATE analytics
+            SET posts_count = posts_count + 1,
+                total_likes = total_likes + COALESCE(NEW.engagement_likes, 0),
+                total_retweets = total_retweets + COALESCE(NEW.engagement_retweets, 0)
+            WHERE date = date(NEW.post_time) AND category = COALESCE(NEW.category, '');
+        END
+        ''',
+        '''
+        CREATE TRIGGER tweets_rollup_delete AFTER DELETE ON tweets
+        BEGIN
+            UPDATE analytics
+            SET posts_count = posts_count - 1,
+                total_likes = total_likes - COALESCE(OLD.engagement_likes, 0),
+                total_retweets = total_retweets - COALESCE(OLD.engagement_retweets, 0)
+            WHERE date = date(OLD.post_time) AND category = COALESCE(OLD.category, '');
+        END
+        ''',
+        *_REBUILD_ROLLUPS_SQL,
+    ],
+    # 4: append-only engagement history, one packed row per observation
+    [
+        '''
+        CREATE TABLE engagement_snapshots (
+            tweet_id INTEGER NOT NULL,
+            observed_at INTEGER NOT NULL,
+            metrics INTEGER NOT NULL,
+            PRIMARY KEY (tweet_id, observed_at)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE TRIGGER tweets_engagement_snapshot
+        AFTER UPDATE OF engagement_likes, engagement_retweets ON tweets
+        WHEN NEW.tweet_id GLOB '[0-9]*'
+        BEGIN
+            INSERT OR REPLACE INTO engagement_snapshots (tweet_id, observed_at, metrics)
+            VALUES (
+                CAST(NEW.tweet_id AS INTEGER),
+                CAST(strftime('%s', 'now') AS INTEGER),
+                COALESCE(NEW.engagement_likes, 0) + (COALESCE(NEW.engagement_retweets, 0) << 32)
+            );
+        END
+        ''',
+    ],
+    # 5: content fingerprints and news article URLs for duplicate detection
+    [
+        "ALTER TABLE tweets ADD COLUMN content_hash TEXT",
+        "ALTER TABLE tweets ADD COLUMN source_url TEXT",
+        _backfill_fingerprints,
+        "CREATE UNIQUE INDEX idx_tweets_content_hash ON tweets (content_hash)",
+        "CREATE UNIQUE INDEX idx_tweets_source_url ON tweets (source_url)",
+    ],
+    # 6: per-day revision counters (bumped whenever a day's rollups change)
+    # and a cache of per-day report partials keyed by the revision they used
+    [
+        '''
+        CREATE TABLE daily_revisions (
+            date DATE PRIMARY KEY,
+            revision INTEGER NOT NULL
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE TRIGGER analytics_revision_insert AFTER INSERT ON analytics
+        BEGIN
+            INSERT INTO daily_revisions (date, revision) VALUES (NEW.date, 1)
+            ON CONFLICT (date) DO UPDATE SET revision = revision + 1;
+        END
+        ''',
+        '''
+        CREATE TRIGGER analytics_revision_update
+        AFTER UPDATE OF posts_count, total_likes, total_retweets ON analytics
+        BEGIN
+            INSERT INTO daily_revisions (date, revision) VALUES (NEW.date, 1)
+            ON CONFLICT (date) DO UPDATE SET revision = revision + 1;
+        END
+        ''',
+        '''
+        CREATE TRIGGER analytics_revision_delete AFTER DELETE ON analytics
+        BEGIN
+            INSERT INTO daily_revisions (date, revision) VALUES (OLD.date, 1)
+            ON CONFLICT (date) DO UPDATE SET revision = revision + 1;
+        END
+        ''',
+        "INSERT INTO daily_revisions (date, revision) SELECT DISTINCT date, 1 FROM analytics",
+        '''
+        CREATE TABLE report_partials (
+            date DATE PRIMARY KEY,
+            revision INTEGER NOT NULL,
+            payload TEXT NOT NULL
+        ) WITHOUT ROWID
+        ''',
+    ],
+    # 7: trigger-maintained hour-of-week x category engagement matrix
+    [
+        '''
+        CREATE TABLE posting_slots (
+            hour_of_week INTEGER NOT NULL,
+            category TEXT NOT NULL,
+            posts_count INTEGER NOT NULL DEFAULT 0,
+            total_likes INTEGER NOT NULL DEFAULT 0,
+            total_retweets INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (hour_of_week, category)
+        ) WITHOUT ROWID
+        ''',
+        f'''
+        CREATE TRIGGER tweets_slot_insert AFTER INSERT ON tweets
+        BEGIN
+            INSERT OR IGNORE INTO posting_slots (hour_of_week, category)
+            VALUES ({_hour_of_week_sql('NEW.post_time')}, COALESCE(NEW.category, ''));
+            UPDATE posting_slots
+            SET posts_count = posts_count + 1,
+                total_likes = total_likes + COALESCE(NEW.engagement_likes, 0),
+                total_retweets = total_retweets + COALESCE(NEW.engagement_retweets, 0)
+            WHERE hour_of_week = {_hour_of_week_sql('NEW.post_time')} AND category = COALESCE(NEW.category, '');
+        END
+        ''',
+        f'''
+        CREATE TRIGGER tweets_slot_update
+        AFTER UPDATE OF post_time, category, engagement_likes, engagement_retweets ON tweets
+        BEGIN
+            UPDATE posting_slots
+            SET posts_count = posts_count - 1,
+                total_likes = total_likes - COALESCE(OLD.engagement_likes, 0),
+                total_retweets = total_retweets - COALESCE(OLD.engagement_retweets, 0)
+            WHERE hour_of_week = {_hour_of_week_sql('OLD.post_time')} AND category = COALESCE(OLD.category, '');
+            INSERT OR IGNORE INTO posting_slots (hour_of_week, category)
+            VALUES ({_hour_of_week_sql('NEW.post_time')}, COALESCE(NEW.category, ''));
+            UPDATE posting_slots
+            SET posts_count = posts_count + 1,
+                total_likes = total_likes + COALESCE(NEW.engagement_likes, 0),
+                total_retweets = total_retweets + COALESCE(NEW.engagement_retweets, 0)
+            WHERE hour_of_week = {_hour_of_week_sql('NEW.post_time')} AND category = COALESCE(NEW.category, '');
+        END
+        ''',
+        f'''
+        CREATE TRIGGER tweets_slot_delete AFTER DELETE ON tweets
+        BEGIN
+            UPDATE posting_slots
+            SET posts_count = posts_count - 1,
+                total_likes = total_likes - COALESCE(OLD.engagement_likes, 0),
+                total_retweets = total_retweets - COALESCE(OLD.engagement_retweets, 0)
+            WHERE hour_of_week = {_hour_of_week_sql('OLD.post_time')} AND category = COALESCE(OLD.category, '');
+        END
+        ''',
+        *_REBUILD_POSTING_SLOTS_SQL,
+    ],
+    # 8: per-tweet sentiment scores reused across topic analyses
+    [
+        '''
+        CREATE TABLE sentiment_cache (
+            tweet_id INTEGER PRIMARY KEY,
+            polarity REAL NOT NULL,
+            subjectivity REAL NOT NULL,
+            scored_at INTEGER NOT NULL  -- Unix seconds
+        )
+        ''',
+        'CREATE INDEX idx_sentiment_cache_scored_at ON sentiment_cache (scored_at)',
+    ],
+]
+
+# Insert a posted tweet. A tweet already on Twitter must never be lost, so a
+# content_hash or source_url already claimed by another row (e.g. one written
+# by a second bot process) is stored as NULL instead of rejecting the row;
+# only a repeated tweet_id is skipped.
+_INSERT_TWEET_SQL = '''
+INSERT INTO tweets (tweet_id, content, category, post_time, content_hash, source_url)
+SELECT ?1, ?2, ?3, ?4,
+       CASE WHEN EXISTS (SELECT 1 FROM tweets WHERE content_hash = ?5) THEN NULL ELSE ?5 END,
+       CASE WHEN EXISTS (SELECT 1 FROM tweets WHERE source_url = ?6) THEN NULL ELSE ?6 END
+WHERE true
+ON CONFLICT (tweet_id) DO NOTHING
+'''
+
+def _to_db_time(value):
+    """Convert a datetime/date to the text form post_time is stored in"""
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(sep=' ')
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return value
+
+
+def _unpack_metrics(metrics):
+    """Split a packed snapshot value into (likes, retweets)"""
+    return metrics & 0xFFFFFFFF, metrics >> 32
+
+
+def _fetch_result(cursor, columnar=False):
+    """Fetch a cursor as a list of row dicts, or a dict of column lists"""
+    rows = cursor.fetchall()
+    if not columnar:
+        return [dict(row) for row in rows]
+    columns = [d[0] for d in cursor.description]
+    values = zip(*rows) if rows else [[] for _ in columns]
+    return {column: list(data) for column, data in zip(columns, values)}
 
 class TweetDatabase:
-    def __init__(self):
-        self.db_file = DB_FILENAME
+    # Pragmas applied to every connection. WAL lets the report thread read
+    # while the scheduler thread writes; NORMAL sync is safe in WAL mode.
+    CONNECTION_PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA cache_size=-8000",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA busy_timeout=5000",
+    )
+
+    # Columns callers may project in range queries
+    TWEET_COLUMNS = (
+        'id', 'tweet_id', 'content', 'category', 'post_time',
+        'engagement_likes', 'engagement_retweets', 'content_hash', 'source_url',
+    )
+
+    # Snapshot downsampling tiers: snapshots older than the age are thinned
+    # to the last observation per bucket of the given number of seconds
+    SNAPSHOT_RETENTION = (
+        (datetime.timedelta(days=1), 3600),
+        (datetime.timedelta(days=7), 86400),
+    )
+
+    def __init__(self, db_file=None):
+        self.db_file = db_file or config.DB_FILENAME
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
         self.init_db()
-    
+        self._load_fingerprints()
+
+    def _get_connection(self):
+        """Return the connection owned by the calling thread, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            for pragma in self.CONNECTION_PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self):
+        """Close every connection opened by this instance"""
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
     def init_db(self):
-        """Initialize the database if it doesn't exist"""
-        if not os.path.exists(self.db_file):
-            conn = sqlite3.connect(self.db_file)
-            c = conn.cursor()
-            
-            # Create tweets table
-            c.execute('''
-            CREATE TABLE tweets (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                tweet_id TEXT,
-                content TEXT,
-                category TEXT,
-                post_time TIMESTAMP,
-                engagement_likes INTEGER DEFAULT 0,
-                engagement_retweets INTEGER DEFAULT 0
-            )
-            ''')
-            
-            # Create analytics table
-            c.execute('''
-            CREATE TABLE analytics (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date DATE,
-                posts_count INTEGER,
-                avg_engagement REAL
-            )
-            ''')
-            
-            conn.commit()
-            conn.close()
-    
-    def add_tweet(self, tweet_id, content, category):
+        """Initialize the database, upgrading the schema to the latest version"""
+        conn = self._get_connection()
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+
+        for target in range(version + 1, len(MIGRATIONS) + 1):
+            with conn:
+                # IMMEDIATE takes the write lock up front so two processes
+                # starting together can't both apply the same migration
+                conn.execute("BEGIN IMMEDIATE")
+                if conn.execute("PRAGMA user_version").fetchone()[0] >= target:
+                    continue
+                for step in MIGRATIONS[target - 1]:
+                    if callable(step):
+                        step(conn)
+                    else:
+                        conn.execute(step)
+                conn.execute(f"PRAGMA user_version = {target}")
+
+    def _load_fingerprints(self):
+        """Warm the in-memory sets of posted content hashes and article URLs"""
+        conn = self._get_connection()
+        # 64-bit prefixes keep the set compact; the unique index stays exact
+        self._content_hashes = {
+            int(row[0][:16], 16)
+            for row in conn.execute("SELECT content_hash FROM tweets WHERE content_hash IS NOT NULL")
+        }
+        self._source_urls = {
+            row[0] for row in conn.execute("SELECT source_url FROM tweets WHERE source_url IS NOT NULL")
+        }
+
+    def remember_content(self, content, source_url=None, category=None):
+        """Mark content (and its article URL) as posted before it reaches the table"""
+        content_hash = content_fingerprint(content, category)
+        if content_hash:
+            self._content_hashes.add(int(content_hash[:16], 16))
+        if source_url:
+            self._source_urls.add(source_url)
+
+    def is_duplicate(self, content, source_url=None, category=None):
+        """Check in O(1) whether this content or article URL was already posted"""
+        if source_url and source_url in self._source_urls:
+            return True
+        content_hash = content_fingerprint(content, category)
+        return bool(content_hash) and int(content_hash[:16], 16) in self._content_hashes
+
+    def add_tweet(self, tweet_id, content, category, post_time=None, source_url=None):
         """Add a new tweet to the database"""
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
-        
-        current_time = datetime.datetime.now()
-        c.execute('''
-        INSERT INTO tweets (tweet_id, content, category, post_time)
-        VALUES (?, ?, ?, ?)
-        ''', (tweet_id, content, category, current_time))
-        
-        conn.commit()
-        conn.close()
-    
+        conn = self._get_connection()
+
+        post_time = post_time or datetime.datetime.now()
+        with conn:
+            conn.execute(_INSERT_TWEET_SQL, (tweet_id, content, category, _to_db_time(post_time),
+                                             content_fingerprint(content, category), source_url))
+        self.remember_content(content, source_url, category)
+
+    def add_tweets_many(self, tweets):
+        """Add many tweets in a single transaction
+
+        `tweets` is an iterable of (tweet_id, content, category, post_time,
+        source_url) tuples. Tweets whose tweet_id is already stored are
+        skipped, so replaying the same batch is harmless. Returns the number
+        inserted.
+        """
+        tweets = list(tweets)
+        conn = self._get_connection()
+
+        with conn:
+            c = conn.executemany(_INSERT_TWEET_SQL, (
+                (tweet_id, content, category, _to_db_time(post_time), content_fingerprint(content, category),
+                 source_url)
+                for tweet_id, content, category, post_time, source_url in tweets))
+
+        for _, content, category, _, source_url in tweets:
+            self.remember_content(content, source_url, category)
+        return c.rowcount
+
     def update_engagement(self, tweet_id, likes, retweets):
         """Update engagement metrics for a tweet"""
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
-        
-        c.execute('''
-        UPDATE tweets
-        SET engagement_likes = ?, engagement_retweets = ?
-        WHERE tweet_id = ?
-        ''', (likes, retweets, tweet_id))
-        
-        conn.commit()
-        conn.close()
-    
+        conn = self._get_connection()
+
+        with conn:
+            conn.execute('''
+            UPDATE tweets
+            SET engagement_likes = ?, engagement_retweets = ?
+            WHERE tweet_id = ?
+            ''', (likes, retweets, tweet_id))
+
+    def update_engagement_many(self, updates):
+        """Update engagement metrics for many tweets in a single transaction
+
+        `updates` is an iterable of (tweet_id, likes, retweets) tuples.
+        Returns the number of rows changed.
+        """
+        conn = self._get_connection()
+
+        with conn:
+            c = conn.executemany('''
+            UPDATE tweets
+            SET engagement_likes = ?, engagement_retweets = ?
+            WHERE tweet_id = ?
+            ''', ((likes, retweets, tweet_id) for tweet_id, likes, retweets in updates))
+
+        return c.rowcount
+
     def get_tweet_history(self, limit=10):
         """Get the most recent tweets"""
-        conn = sqlite3.connect(self.db_file)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        
-        c.execute('''
+        conn = self._get_connection()
+
+        c = conn.execute('''
         SELECT * FROM tweets
         ORDER BY post_time DESC
         LIMIT ?
         ''', (limit,))
-        
-        result = [dict(row) for row in c.fetchall()]
-        conn.close()
-        
-        return result
-    
+
+        return [dict(row) for row in c.fetchall()]
+
+    def get_tweets_between(self, start, end, categories=None, columns=None, columnar=False, after_id=None):
+        """Get tweets posted in [start, end), filtered and projected in SQL
+
+        `after_id` limits the result to rows inserted after that row id.
+        Returns a list of row dicts, or a dict of column lists when
+        `columnar` is True (cheap to turn into a DataFrame).
+        """
+        columns = self._check_columns(columns)
+
+        query = f"SELECT {', '.join(columns)} FROM tweets WHERE post_time >= ? AND post_time < ?"
+        params = [_to_db_time(start), _to_db_time(end)]
+        if categories:
+            categories = list(categories)
+            query += f" AND category IN ({', '.join('?' * len(categories))})"
+            params.extend(categories)
+        if after_id is not None:
+            query += " AND id > ?"
+            params.append(after_id)
+        query += " ORDER BY post_time"
+
+        conn = self._get_connection()
+        return _fetch_result(conn.execute(query, params), columnar)
+
+    def iter_tweet_chunks(self, start=None, end=None, columns=None, chunk_size=None, ordered=True,
+                          timed=False):
+        """Stream tweets posted in [start, end) as dicts of column lists
+
+        Rows are pulled from the cursor `chunk_size` at a time, so memory use
+        is bounded by the chunk rather than the size of the history. Either
+        bound may be None for an open-ended range. Pass ordered=False when
+        row order doesn't matter to scan the table in storage order, which
+        is about twice as fast as walking the post_time index. Pass
+        timed=True to skip rows without a post_time when both bounds are open.
+        """
+        columns = self._check_columns(columns)
+        chunk_size = chunk_size or config.STREAM_CHUNK_SIZE
+
+        query = f"SELECT {', '.join(columns)} FROM tweets WHERE 1"
+        params = []
+        if start is not None:
+            query += " AND post_time >= ?"
+            params.append(_to_db_time(start))
+        if end is not None:
+            query += " AND post_time < ?"
+            params.append(_to_db_time(end))
+        if timed:
+            query += " AND post_time IS NOT NULL"
+        if ordered:
+            query += " ORDER BY post_time"
+
+        conn = self._get_connection()
+        cursor = conn.execute(query, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield {column: list(values) for column, values in zip(columns, zip(*rows))}
+        finally:
+            cursor.close()
+
+    def _check_columns(self, columns):
+        """Return the requested tweet columns, rejecting unknown names"""
+        columns = list(columns or self.TWEET_COLUMNS)
+        unknown = set(columns) - set(self.TWEET_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown tweet columns: {sorted(unknown)}")
+        return columns
+
+    def get_top_tweets(self, start, end, limit=1):
+        """Get the tweets with the most engagement posted in [start, end)"""
+        conn = self._get_connection()
+
+        c = conn.execute('''
+        SELECT * FROM tweets
+        WHERE post_time >= ? AND post_time < ?
+        ORDER BY engagement_likes + engagement_retweets DESC, post_time DESC
+        LIMIT ?
+        ''', (_to_db_time(start), _to_db_time(end), limit))
+
+        return [dict(row) for row in c.fetchall()]
+
     def get_category_stats(self):
         """Get stats on tweet performance by category"""
-        conn = sqlite3.connect(self.db_file)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        
-        c.execute('''
-        SELECT category, 
-               COUNT(*) as tweet_count,
-               AVG(engagement_likes + engagement_retweets) as avg_engagement
-        FROM tweets
+        conn = self._get_connection()
+
+        # Reads the daily rollups, so the cost grows with days, not tweets
+        c = conn.execute('''
+        SELECT NULLIF(category, '') as category,
+               SUM(posts_count) as tweet_count,
+               CAST(SUM(total_likes + total_retweets) AS REAL) / SUM(posts_count) as avg_engagement
+        FROM analytics
         GROUP BY category
+        HAVING SUM(posts_count) > 0
+        ''')
+
+        return [dict(row) for row in c.fetchall()]
+
+    def get_daily_rollups(self, start, end, categories=None, columnar=False):
+        """Get per-day, per-category rollups for dates in [start, end)
+
+        Each row has date, category, posts_count, total_likes and
+        total_retweets. Returns a dict of column lists when `columnar` is True.
+        """
+        query = '''
+        SELECT date, NULLIF(category, '') as category, posts_count, total_likes, total_retweets
+        FROM analytics
+        WHERE date >= ? AND date < ? AND posts_count > 0
+        '''
+        params = [_to_db_time(start), _to_db_time(end)]
+        if categories:
+            categories = list(categories)
+            query += f" AND category IN ({', '.join('?' * len(categories))})"
+            params.extend(categories)
+        query += " ORDER BY date, category"
+
+        conn = self._get_connection()
+        return _fetch_result(conn.execute(query, params), columnar)
+
+    def get_daily_revisions(self, start, end):
+        """Get {date: revision} for days in [start, end) that have ever had tweets
+
+        A day's revision increases whenever its rollups change, so a result
+        cached for that day stays valid while its revision is current.
+        """
+        conn = self._get_connection()
+        c = conn.execute(
+            "SELECT date, revision FROM daily_revisions WHERE date >= ? AND date < ?",
+            (_to_db_time(start), _to_db_time(end)))
+        return {row['date']: row['revision'] for row in c.fetchall()}
+
+    def get_report_partials(self, start, end):
+        """Get cached {date: (revision, payload)} report partials for days in [start, end)"""
+        conn = self._get_connection()
+        c = conn.execute(
+            "SELECT date, revision, payload FROM report_partials WHERE date >= ? AND date < ?",
+            (_to_db_time(start), _to_db_time(end)))
+        return {row['date']: (row['revision'], row['payload']) for row in c.fetchall()}
+
+    def save_report_partials(self, partials):
+        """Store (date, revision, payload) report partials, replacing older ones"""
+        conn = self._get_connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO report_partials (date, revision, payload) VALUES (?, ?, ?)",
+                partials)
+
+    def get_posting_slots(self, category=None):
+        """Get the hour-of-week engagement matrix as a list of row dicts
+
+        Each row has hour_of_week (0 = Monday 00h), category, posts_count,
+        total_likes and total_retweets, optionally for one category only.
+        """
+        query = '''
+        SELECT hour_of_week, NULLIF(category, '') as category, posts_count, total_likes, total_retweets
+        FROM posting_slots
+        WHERE posts_count > 0
+        '''
+        params = []
+        if category is not None:
+            query += " AND category = ?"
+            params.append(category)
+        query += " ORDER BY hour_of_week, category"
+
+        conn = self._get_connection()
+        return [dict(row) for row in conn.execute(query, params).fetchall()]
+
+    def get_engagement_curves(self, tweet_ids, start=None):
+        """Get engagement snapshots for many tweets in one call
+
+        Returns {tweet_id: [(observed_at, likes, retweets), ...]} ordered by
+        observation time, optionally only from `start` onwards.
+        """
+        ids = [int(tweet_id) for tweet_id in tweet_ids]
+        since = int(start.timestamp()) if start else 0
+        curves = {str(tweet_id): [] for tweet_id in ids}
+        conn = self._get_connection()
+
+        # Chunk to stay under SQLite's bound-parameter limit
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            c = conn.execute(f'''
+            SELECT tweet_id, observed_at, metrics FROM engagement_snapshots
+            WHERE tweet_id IN ({', '.join('?' * len(chunk))}) AND observed_at >= ?
+            ORDER BY tweet_id, observed_at
+            ''', (*chunk, since))
+            for tweet_id, observed_at, metrics in c:
+                likes, retweets = _unpack_metrics(metrics)
+                curves[str(tweet_id)].append(
+                    (datetime.datetime.fromtimestamp(observed_at), likes, retweets))
+
+        return curves
+
+    def get_last_snapshot_times(self, tweet_ids):
+        """Get {tweet_id: datetime of latest engagement snapshot} for many tweets"""
+        ids = [int(tweet_id) for tweet_id in tweet_ids]
+        last_seen = {}
+        conn = self._get_connection()
+
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            c = conn.execute(f'''
+            SELECT tweet_id, MAX(observed_at) FROM engagement_snapshots
+            WHERE tweet_id IN ({', '.join('?' * len(chunk))})
+            GROUP BY tweet_id
+            ''', chunk)
+            for tweet_id, observed_at in c:
+                last_seen[str(tweet_id)] = datetime.datetime.fromtimestamp(observed_at)
+
+        return last_seen
+
+    def get_sentiment_scores(self, tweet_ids, since):
+        """Get {tweet_id: (polarity, subjectivity, scored_at)} for tweets scored at or after `since`"""
+        ids = [int(tweet_id) for tweet_id in tweet_ids]
+        scores = {}
+        conn = self._get_connection()
+
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            c = conn.execute(f'''
+            SELECT tweet_id, polarity, subjectivity, scored_at FROM sentiment_cache
+            WHERE tweet_id IN ({', '.join('?' * len(chunk))}) AND scored_at >= ?
+            ''', (*chunk, int(since.timestamp())))
+            for tweet_id, polarity, subjectivity, scored_at in c:
+                scores[tweet_id] = (polarity, subjectivity, datetime.datetime.fromtimestamp(scored_at))
+
+        return scores
+
+    def save_sentiment_scores(self, scores, scored_at=None):
+        """Store (tweet_id, polarity, subjectivity) scores, replacing older ones"""
+        scored_at = int((scored_at or datetime.datetime.now()).timestamp())
+        conn = self._get_connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO sentiment_cache (tweet_id, polarity, subjectivity, scored_at) VALUES (?, ?, ?, ?)",
+                [(int(tweet_id), polarity, subjectivity, scored_at) for tweet_id, polarity, subjectivity in scores])
+
+    def evict_sentiment_scores(self, before):
+        """Delete sentiment scores older than `before`; returns the number removed"""
+        conn = self._get_connection()
+        with conn:
+            c = conn.execute("DELETE FROM sentiment_cache WHERE scored_at < ?", (int(before.timestamp()),))
+        return c.rowcount
+
+    def compact_engagement_snapshots(self, now=None):
+        """Downsample old engagement snapshots according to SNAPSHOT_RETENTION
+
+        Returns the number of snapshots removed.
+        """
+        now = now or datetime.datetime.now()
+        conn = self._get_connection()
+        removed = 0
+
+        with conn:
+            for age, bucket in self.SNAPSHOT_RETENTION:
+                cutoff = int((now - age).timestamp())
+                # Drop a snapshot if a later one exists in the same bucket
+                c = conn.execute('''
+                DELETE FROM engagement_snapshots
+                WHERE observed_at < :cutoff AND EXISTS (
+                    SELECT 1 FROM engagement_snapshots AS later
+                    WHERE later.tweet_id = engagement_snapshots.tweet_id
+                      AND later.observed_at > engagement_snapshots.observed_at
+                      AND later.observed_at < :cutoff
+                      AND later.observed_at / :bucket = engagement_snapshots.observed_at / :bucket
+                )
+                ''', {'cutoff': cutoff, 'bucket': bucket})
+                removed += c.rowcount
+
+        return removed
+
+    def get_engagement_snapshots_between(self, start, end, columnar=False):
+        """Get unpacked engagement snapshots observed in [start, end)"""
+        conn = self._get_connection()
+
+        c = conn.execute('''
+        SELECT tweet_id, observed_at,
+               metrics & 4294967295 as likes, metrics >> 32 as retweets
+        FROM engagement_snapshots
+        WHERE observed_at >= ? AND observed_at < ?
+        ORDER BY observed_at, tweet_id
+        ''', (int(start.timestamp()), int(end.timestamp())))
+
+        return _fetch_result(c, columnar)
+
+    def get_monthly_signatures(self):
+        """Get a cheap change signature per month for tweets and engagement history
+
+        Returns {'tweets': {'YYYY-MM': (...)}, 'engagement': {'YYYY-MM': (...)}};
+        a month's signature changes whenever its rows are added, removed or
+        re-scored. Tweet signatures sum the month's daily_revisions, which
+        grow on every rollup write, so changes that cancel out in the totals
+        still change the signature.
+        """
+        conn = self._get_connection()
+
+        tweets = conn.execute('''
+        SELECT substr(date, 1, 7), SUM(revision)
+        FROM daily_revisions
+        WHERE substr(date, 1, 7) IN (
+            SELECT substr(date, 1, 7) FROM analytics
+            GROUP BY 1
+            HAVING SUM(posts_count) > 0
+        )
+        GROUP BY 1
+        ''')
+        engagement = conn.execute('''
+        SELECT strftime('%Y-%m', observed_at, 'unixepoch', 'localtime'),
+               COUNT(*), MAX(observed_at), TOTAL(metrics)
+        FROM engagement_snapshots
+        GROUP BY 1
         ''')
-        
-        result = [dict(row) for row in c.fetchall()]
-        conn.close()
-        
-        return result 
\ No newline at end of file
+
+        return {
+            'tweets': {row[0]: tuple(row[1:]) for row in tweets},
+            'engagement': {row[0]: tuple(row[1:]) for row in engagement},
+        }
+
+    def rebuild_rollups(self):
+        """Recompute the daily rollups and posting slots from scratch (for backfills or repairs)"""
+        conn = self._get_connection()
+
+        with conn:
+            for statement in _REBUILD_ROLLUPS_SQL + _REBUILD_POSTING_SLOTS_SQL:
+                conn.execute(statement)
+
+        return conn.execute("SELECT COUNT(*) FROM analytics").fetchone()[0]
@@ -0,0 +1,162 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from textblob.en import sentiment as pattern_sentiment
+from textblob._text import EMOTICONS, PUNCTUATION
+from logger import logger
+import config
+
+class LexiconScorer:
+    """Batch polarity/subjectivity scoring with TextBlob's pattern lexicon.
+
+    The lexicon is flattened once into a dict of word -> (polarity,
+    subjectivity, intensity, is_modifier), and texts are scored with a
+    direct port of pattern's Sentiment.assessments() rules (modifiers,
+    negations, emoticons). For text produced by SentimentAnalyzer.clean_text
+    (lowercase words and whitespace only) the scores equal
+    TextBlob(text).sentiment; punctuation-driven rules such as "!" boosts
+    cannot apply to such text and are not implemented.
+    """
+
+    NEGATIONS = frozenset(pattern_sentiment.negations)
+
+    def __init__(self):
+        if not dict.__len__(pattern_sentiment):
+            pattern_sentiment.load()
+        self.words = {
+            word: (*senses[None], any(pos in senses for pos in pattern_sentiment.modifiers))
+            for word, senses in dict.items(pattern_sentiment)
+        }
+        # Emoticons the assessment rules can match (short, non-alphabetic tokens)
+        self.emoticons = {}
+        for (_, polarity), forms in EMOTICONS.items():
+            for form in forms:
+                form = form.lower()
+                if not form.isalpha() and len(form) <= 5 and form not in PUNCTUATION:
+                    self.emoticons.setdefault(form, polarity)
+
+    def score(self, text):
+        """Return (polarity, subjectivity) for one cleaned text"""
+        words = self.words
+        negations = self.NEGATIONS
+        assessments = []   # [polarity, subjectivity, intensity, negated]
+        modifier = None    # Preceding known modifier ("very good")
+        negation = None    # Preceding negation ("not good")
+
+        for token in text.lower().split():
+            # The tokenizer splits leading/trailing underscores into tokens
+            # that never affect the score
+            word = token.strip('_')
+            if not word:
+                continue
+
+            entry = words.get(word)
+            if entry is not None:
+                polarity, subjectivity, intensity, is_modifier = entry
+                if modifier is None:
+                    assessments.append([polarity, subjectivity, intensity, False])
+                else:
+                    last = assessments[-1]
+                    last[0] = max(-1.0, min(polarity * last[2], 1.0))
+                    last[1] = max(-1.0, min(subjectivity * last[2], 1.0))
+                    last[2] = intensity
+                if negation is not None:
+                    assessments[-1][2] = 1.0 / assessments[-1][2]
+                    assessments[-1][3] = True
+                modifier = word if is_modifier else None
+                negation = word if word in negations else None
+            else:
+                if word in negations:
+                    negation = word
+                elif negation and len(word.strip("'")) > 1:
+                    negation = None
+                if negation is not None and modifier is not None and modifier.endswith('ly'):
+                    assessments[-1][3] = True
+                    negation = None
+                elif modifier and len(word) > 2:
+                    modifier = None
+                if word in self.emoticons:
+                    assessments.append([self.emoticons[word], 1.0, 1.0, False])
+
+        if not assessments:
+            return 0.0, 0.0
+        # "not good" = slightly bad, "not bad" = slightly good
+        polarity = sum(p * -0.5 if negated else p for p, _, _, negated in assessments)
+        subjectivity = sum(s for _, s, _, _ in assessments)
+        return polarity / len(assessments), subjectivity / len(assessments)
+
+    def score_many(self, texts):
+        """Score a list or Series of cleaned texts; returns (polarity, subjectivity) float arrays"""
+        scores = [self.score(text) for text in texts]
+        if not scores:
+            return np.zeros(0), np.zeros(0)
+        polarity, subjectivity = np.array(scores, dtype=np.float64).T
+        return polarity, subjectivity
+
+_scorer = None
+_scorer_lock = threading.Lock()
+
+def get_scorer():
+    """Return the process-wide scorer, loading the lexicon on first use"""
+    global _scorer
+    with _scorer_lock:
+        if _scorer is None:
+            _scorer = LexiconScorer()
+        return _scorer
+
+def _warm_worker():
+    """Pool initializer: load the lexicon once per worker process"""
+    get_scorer()
+
+def _score_chunk(texts):
+    return get_scorer().score_many(texts)
+
+class ScoringPool:
+    """Shard scoring of large batches across worker processes.
+
+    Batches are split into chunks of `chunk_size` texts and scored by
+    workers that load the lexicon once, when they start. Batches smaller
+    than `threshold` are scored in-process, where pickling texts to a
+    worker would cost more than it saves. Workers are started lazily with
+    the 'spawn' method, like the chart renderer's.
+    """
+
+    def __init__(self, processes, chunk_size=None, threshold=None):
+        self.processes = processes
+        self.chunk_size = chunk_size or config.SENTIMENT_SCORING_CHUNK_SIZE
+        self.threshold = threshold if threshold is not None else config.SENTIMENT_PARALLEL_THRESHOLD
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_warm_worker
+                )
+            return self._executor
+
+    def score_many(self, texts):
+        """Score a batch of cleaned texts; returns (polarity, subjectivity) float arrays"""
+        texts = list(texts)
+        if len(texts) < self.threshold:
+            return get_scorer().score_many(texts)
+
+        chunks = [texts[i:i + self.chunk_size] for i in range(0, len(texts), self.chunk_size)]
+        try:
+            results = list(self._get_executor().map(_score_chunk, chunks))
+        except Exception as e:
+            logger.warning(f"Scoring worker pool unavailable, scoring in-process: {e}")
+            return get_scorer().score_many(texts)
+        return (np.concatenate([polarity for polarity, _ in results]),
+                np.concatenate([subjectivity for _, subjectivity in results]))
+
+    def shutdown(self, wait=True):
+        """Stop the worker processes"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
@@ -0,0 +1,179 @@
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from logger import logger
+import config
+
+# Queue marker telling the writer thread to drain and exit
+_STOP = object()
+
+class WriteBehindWriter:
+    """Persist posted tweets on a background thread so posting never waits on SQLite.
+
+    Every record is appended to a spill file before it is queued. The file
+    is truncated only once everything in it has been committed, and it is
+    replayed on startup, so a crash or a full queue never loses a record.
+    """
+
+    def __init__(self, db, spill_file=None, max_queue=None, batch_size=None, flush_interval=None,
+                 max_retries=None):
+        self.db = db
+        self.spill_file = spill_file or config.WRITE_BEHIND_SPILL_FILE
+        self.batch_size = batch_size or config.WRITE_BEHIND_BATCH_SIZE
+        self.flush_interval = flush_interval or config.WRITE_BEHIND_FLUSH_INTERVAL
+        self.max_retries = max_retries or config.WRITE_BEHIND_MAX_RETRIES
+        self._queue = queue.Queue(maxsize=max_queue or config.WRITE_BEHIND_QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self._overflow = False
+        self._stranded = False  # A batch gave up; its records must stay in the spill file
+        self._closed = False
+
+        self._replay_spill_file()
+        self._spill = open(self.spill_file, 'a', encoding='utf-8')
+
+        self._thread = threading.Thread(target=self._run, name='write-behind')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def enqueue(self, tweet_id, content, category, post_time=None, source_url=None):
+        """Queue a tweet record for persistence without touching the database"""
+        record = {
+            'tweet_id': tweet_id,
+            'content': content,
+            'category': category,
+            'post_time': (post_time or datetime.now()).isoformat(sep=' '),
+            'source_url': source_url,
+        }
+        self.db.remember_content(content, source_url, category)
+
+        with self._lock:
+            if self._closed:
+                # Writer already shut down: fall back to a direct write
+                self.db.add_tweets_many([self._to_row(record)])
+                return
+
+            self._spill.write(json.dumps(record) + '\n')
+            self._spill.flush()
+            os.fsync(self._spill.fileno())
+
+            try:
+                self._queue.put_nowait(record)
+            except queue.Full:
+                # The record is safe in the spill file; replay it from there
+                self._overflow = True
+                logger.warning("Write-behind queue full, record kept in spill file")
+
+    def close(self, timeout=10):
+        """Flush pending records and stop the writer thread"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.error("Write-behind queue still full at shutdown, pending records stay in the spill file")
+        self._thread.join(timeout=timeout)
+        if self._thread.is_alive():
+            # The thread still owns the spill file; leave it open for it to finish
+            logger.warning("Write-behind writer still busy at shutdown, pending records stay in the spill file")
+            return
+        self._spill.close()
+        logger.info("Write-behind writer flushed and stopped")
+
+    def _run(self):
+        """Drain the queue in batches until told to stop"""
+        stopping = False
+        while not stopping:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = []
+            item = first
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            self._write_batch(batch)
+
+    def _write_batch(self, batch):
+        """Commit a batch, replay any overflow, then truncate the spill file if drained"""
+        if not self._commit(batch):
+            self._stranded = True
+
+        with self._lock:
+            overflow, self._overflow = self._overflow, False
+            records = self._read_spill_file() if overflow else []
+
+        # Replay outside the lock so enqueue() never waits on the database
+        if records:
+            if self._commit(records):
+                logger.info(f"Replayed {len(records)} spilled tweet records")
+                self._stranded = False
+            else:
+                self._stranded = True
+
+        with self._lock:
+            if self._queue.empty() and not self._stranded:
+                self._spill.truncate(0)
+
+    def _commit(self, records):
+        """Write records with bounded retries; False leaves them for the next startup replay"""
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                inserted = self.db.add_tweets_many([self._to_row(record) for record in records])
+                if inserted < len(records):
+                    logger.warning(f"{len(records) - inserted} of {len(records)} queued tweets were already stored")
+                return True
+            except Exception as e:
+                logger.error(f"Error writing {len(records)} queued tweets (attempt {attempt}/{self.max_retries}): {e}")
+                if attempt < self.max_retries:
+                    time.sleep(self.flush_interval)
+
+        logger.error(f"Giving up on {len(records)} queued tweets, kept in spill file for replay on next startup")
+        return False
+
+    def _read_spill_file(self):
+        """Load the records in the spill file, skipping torn lines"""
+        if not os.path.exists(self.spill_file):
+            return []
+
+        records = []
+        with open(self.spill_file, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # A torn final line from a crash mid-write
+                    logger.warning(f"Skipping unreadable spill record: {line[:80]!r}")
+        return records
+
+    def _replay_spill_file(self):
+        """Write any records left in the spill file on startup; inserts are idempotent"""
+        records = self._read_spill_file()
+        if records:
+            inserted = self.db.add_tweets_many([self._to_row(record) for record in records])
+            logger.info(f"Replayed {len(records)} spilled tweet records ({inserted} new)")
+            with open(self.spill_file, 'w', encoding='utf-8'):
+                pass
+
+    @staticmethod
+    def _to_row(record):
+        return (record['tweet_id'], record['content'], record['category'],
+                record['post_time'], record.get('source_url'))
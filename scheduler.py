@@ -6,6 +6,17 @@ from logger import logger
 import config
 
 class TweetScheduler:
+    WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+    
+    # POSTING_SCHEDULE key -> (bot method, category its tweets are stored under, weekdays it runs on)
+    POSTING_JOBS = {
+        'news': ('post_news', 'tech', WEEKDAYS),
+        'ml': ('post_ml_snippet', 'ml', WEEKDAYS),
+        'sentiment': ('post_sentiment_analysis', 'sentiment', WEEKDAYS),
+        'code_tip': ('post_code_tip', 'code_tip', ['tuesday', 'thursday']),
+        'interview': ('post_interview_question', 'interview', ['monday']),
+    }
+    
     def __init__(self, bot):
         self.bot = bot
         self.running = False
@@ -26,13 +37,35 @@ class TweetScheduler:
         """Set up scheduled tasks based on config"""
         logger.info("Setting up tweet schedule")
         
+        if config.ADAPTIVE_SCHEDULE:
+            self.schedule_adaptive_posts()
+            # Re-plan posting slots nightly from the latest engagement data
+            schedule.every().day.at("03:45").do(self.reschedule_posts)
+            logger.info("Scheduled adaptive posting slot re-planning daily at 03:45")
+        else:
+            self.schedule_fixed_posts()
+        
+        # Schedule weekly analytics (Sunday night)
+        schedule.every().sunday.at("23:00").do(self.bot.generate_weekly_report)
+        logger.info("Scheduled weekly analytics report on Sunday at 23:00")
+        
+        # Schedule engagement refreshes (budgeted by the refresh planner)
+        schedule.every(config.ENGAGEMENT_REFRESH_TICK_MINUTES).minutes.do(self.bot.refresh_engagement)
+        logger.info(f"Scheduled engagement refresh every {config.ENGAGEMENT_REFRESH_TICK_MINUTES} minutes")
+        
+        # Schedule database maintenance (nightly)
+        schedule.every().day.at("03:30").do(self.bot.run_maintenance)
+        logger.info("Scheduled database maintenance daily at 03:30")
+    
+    def schedule_fixed_posts(self):
+        """Schedule posts at the fixed times in config.POSTING_SCHEDULE"""
         # Schedule news posts
         if 'news' in config.POSTING_SCHEDULE:
             times = self.parse_schedule_times(config.POSTING_SCHEDULE['news'])
             for t in times:
                 schedule.every().day.at(f"{t.hour:02d}:{t.minute:02d}").do(
                     self.bot.post_news
-                )
+                ).tag('posts')
                 logger.info(f"Scheduled news post at {t.hour:02d}:{t.minute:02d}")
         
         # Schedule ML snippets
@@ -41,7 +74,7 @@ class TweetScheduler:
             for t in times:
                 schedule.every().day.at(f"{t.hour:02d}:{t.minute:02d}").do(
                     self.bot.post_ml_snippet
-                )
+                ).tag('posts')
                 logger.info(f"Scheduled ML snippet at {t.hour:02d}:{t.minute:02d}")
         
         # Schedule sentiment analysis
@@ -50,7 +83,7 @@ class TweetScheduler:
             for t in times:
                 schedule.every().day.at(f"{t.hour:02d}:{t.minute:02d}").do(
                     self.bot.post_sentiment_analysis
-                )
+                ).tag('posts')
                 logger.info(f"Scheduled sentiment analysis at {t.hour:02d}:{t.minute:02d}")
         
         # Schedule code tips (every Tuesday and Thursday)
@@ -59,10 +92,10 @@ class TweetScheduler:
             for t in times:
                 schedule.every().tuesday.at(f"{t.hour:02d}:{t.minute:02d}").do(
                     self.bot.post_code_tip
-                )
+                ).tag('posts')
                 schedule.every().thursday.at(f"{t.hour:02d}:{t.minute:02d}").do(
                     self.bot.post_code_tip
-                )
+                ).tag('posts')
                 logger.info(f"Scheduled code tips on Tuesday and Thursday at {t.hour:02d}:{t.minute:02d}")
         
         # Schedule interview questions (every Monday)
@@ -71,12 +104,44 @@ class TweetScheduler:
             for t in times:
                 schedule.every().monday.at(f"{t.hour:02d}:{t.minute:02d}").do(
                     self.bot.post_interview_question
-                )
+                ).tag('posts')
                 logger.info(f"Scheduled interview questions on Monday at {t.hour:02d}:{t.minute:02d}")
+    
+    def schedule_adaptive_posts(self):
+        """Schedule posts at the best-performing hours for each weekday
         
-        # Schedule weekly analytics (Sunday night)
-        schedule.every().sunday.at("23:00").do(self.bot.generate_weekly_report)
-        logger.info("Scheduled weekly analytics report on Sunday at 23:00")
+        Hours come from the hour-of-week engagement matrix; when a category
+        has too little data the fixed POSTING_SCHEDULE times fill the gaps.
+        The number of posts per day and the weekdays each type runs on are
+        the same as in fixed mode.
+        """
+        for key, time_str in config.POSTING_SCHEDULE.items():
+            if key not in self.POSTING_JOBS:
+                continue
+            method, category, days = self.POSTING_JOBS[key]
+            fixed_times = self.parse_schedule_times(time_str)
+            
+            for day in days:
+                hours = self.bot.analytics.best_posting_hours(category, self.WEEKDAYS.index(day), len(fixed_times))
+                times = [datetime.time(hour=hour) for hour in hours]
+                for t in fixed_times:
+                    if len(times) >= len(fixed_times):
+                        break
+                    if all(abs(t.hour - other.hour) >= config.ADAPTIVE_SCHEDULE_MIN_GAP_HOURS for other in times):
+                        times.append(t)
+                
+                times.sort()
+                for t in times:
+                    getattr(schedule.every(), day).at(f"{t.hour:02d}:{t.minute:02d}").do(
+                        getattr(self.bot, method)
+                    ).tag('posts')
+                logger.info(f"Scheduled {key} on {day.capitalize()} at "
+                            f"{', '.join(f'{t.hour:02d}:{t.minute:02d}' for t in times)}")
+    
+    def reschedule_posts(self):
+        """Replace the posting jobs with slots picked from current engagement data"""
+        schedule.clear('posts')
+        self.schedule_adaptive_posts()
     
     def run_scheduler(self):
         """Run the scheduler loop"""
@@ -1,15 +1,214 @@
 import tweepy
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from textblob import TextBlob
 import os
+import queue
 import re
-from datetime import datetime
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
 import config
 from logger import logger
+from charts import get_chart_cache
+from lexicon import get_scorer, ScoringPool
+
+# clean_text's URL and mention substitutions as a single pass. The mention
+# branch stops before an embedded URL because clean_text strips URLs first.
+_URL_MENTION_PATTERN = re.compile(r'http\S+|www\S+|@(?:(?!http\S|www\S)\w)+')
+_WORD_OR_SPACE = re.compile(r'[\w\s]')
+# Joins a batch into one string; it is whitespace, so URLs and mentions stop at it
+_BATCH_SEPARATOR = '\x1e'
+
+class _PunctuationTable(dict):
+    """str.translate table that deletes all but word and whitespace characters, filled on demand"""
+    
+    def __missing__(self, code):
+        value = code if _WORD_OR_SPACE.match(chr(code)) else None
+        self[code] = value
+        return value
+
+_PUNCTUATION_TABLE = _PunctuationTable()
+
+# Queue marker telling the consumer that the producer has no more pages
+_DONE = object()
+
+def _put_until_stopped(pages, item, stop):
+    """Put an item on a bounded queue, giving up once the consumer has stopped reading"""
+    while not stop.is_set():
+        try:
+            pages.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+# Topics analysed when trends have never been fetched successfully
+FALLBACK_TOPICS = ["AI", "Python", "Machine Learning", "Data Science", "Technology"]
+
+def _score_arrays(tweets, scores):
+    """(polarity, subjectivity) arrays for the tweets of a page that have a score"""
+    values = [scores[tweet_id] for tweet_id, _ in tweets if tweet_id in scores]
+    if not values:
+        return np.zeros(0), np.zeros(0)
+    polarity, subjectivity = np.array(values, dtype=np.float64).T
+    return polarity, subjectivity
+
+class _SampleScorer:
+    """Collect per-topic scores for sample pages as they arrive.
+
+    Without a scoring pool each page is scored on arrival, overlapping
+    the download of the next one. With a pool, pages from all topics are
+    held until they add up to the pool's threshold and then scored as one
+    batch, so large samples are sharded across the workers; at most
+    one batch of text is held at a time.
+    """
+
+    def __init__(self, analyzer):
+        self.analyzer = analyzer
+        pool = analyzer.scoring_pool
+        self.batch_size = pool.threshold if pool is not None else 0
+        self.scores = {}     # topic -> ([polarity arrays], [subjectivity arrays])
+        self._pending = []   # (topic, page) held for the next pooled batch
+        self._pending_tweets = 0
+
+    def add(self, topic, tweets):
+        """Score a page now, or queue it for the next pooled batch"""
+        self.scores.setdefault(topic, ([], []))
+        if not self.batch_size:
+            self._store(topic, tweets, self.analyzer.score_tweet_map(tweets))
+            return
+        self._pending.append((topic, tweets))
+        self._pending_tweets += len(tweets)
+        if self._pending_tweets >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Score the queued pages as one batch"""
+        if not self._pending:
+            return
+        scores = self.analyzer.score_tweet_map([tweet for _, page in self._pending for tweet in page])
+        for topic, page in self._pending:
+            self._store(topic, page, scores)
+        self._pending, self._pending_tweets = [], 0
+
+    def _store(self, topic, tweets, scores):
+        polarity, subjectivity = _score_arrays(tweets, scores)
+        self.scores[topic][0].append(polarity)
+        self.scores[topic][1].append(subjectivity)
+
+    def frames(self):
+        """Flush and return {topic: scores DataFrame} for topics with usable tweets"""
+        self.flush()
+        frames = {}
+        for topic, (polarities, subjectivities) in self.scores.items():
+            df = self.analyzer._scores_frame(polarities, subjectivities)
+            if not df.empty:
+                frames[topic] = df
+        return frames
+
+class SentimentCache:
+    """Two-tier cache of per-tweet (polarity, subjectivity) scores.
+
+    An in-memory LRU answers repeat lookups within a run; misses fall
+    through to the database's sentiment_cache table, which survives
+    restarts. Scores older than the TTL are treated as misses and evicted
+    from disk by evict(). Without a database only the memory tier is used.
+    """
+
+    def __init__(self, db=None, max_items=None, ttl_hours=None):
+        self.db = db
+        self.max_items = max_items or config.SENTIMENT_CACHE_MAX_ITEMS
+        self.ttl = timedelta(hours=ttl_hours or config.SENTIMENT_CACHE_TTL_HOURS)
+        self._memory = OrderedDict()   # tweet_id -> (polarity, subjectivity, scored_at)
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get_many(self, tweet_ids, now=None):
+        """Return {tweet_id: (polarity, subjectivity)} for the cached, unexpired tweets"""
+        since = (now or datetime.now()) - self.ttl
+        found = {}
+        missing = []
+        with self._lock:
+            for tweet_id in tweet_ids:
+                entry = self._memory.get(tweet_id)
+                if entry is not None and entry[2] >= since:
+                    self._memory.move_to_end(tweet_id)
+                    found[tweet_id] = entry[:2]
+                else:
+                    missing.append(tweet_id)
+            self.memory_hits += len(found)
+
+        stored = {}
+        if missing and self.db is not None:
+            try:
+                stored = self.db.get_sentiment_scores(missing, since)
+            except Exception as e:
+                logger.error(f"Error reading cached sentiment scores: {e}")
+
+        with self._lock:
+            for tweet_id in missing:
+                entry = stored.get(int(tweet_id))
+                if entry is not None:
+                    self._remember(tweet_id, entry)
+                    found[tweet_id] = entry[:2]
+                    self.disk_hits += 1
+                else:
+                    self.misses += 1
+        return found
+
+    def put_many(self, scores, now=None):
+        """Cache {tweet_id: (polarity, subjectivity)} scores in both tiers"""
+        if not scores:
+            return
+        now = now or datetime.now()
+        with self._lock:
+            for tweet_id, (polarity, subjectivity) in scores.items():
+                self._remember(tweet_id, (polarity, subjectivity, now))
+
+        if self.db is not None:
+            try:
+                self.db.save_sentiment_scores(
+                    [(tweet_id, polarity, subjectivity) for tweet_id, (polarity, subjectivity) in scores.items()],
+                    scored_at=now)
+            except Exception as e:
+                logger.error(f"Error saving sentiment scores: {e}")
+
+    def _remember(self, tweet_id, entry):
+        # Caller holds the lock
+        self._memory[tweet_id] = entry
+        self._memory.move_to_end(tweet_id)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def evict(self, now=None):
+        """Drop expired scores from both tiers; returns the number removed from disk"""
+        cutoff = (now or datetime.now()) - self.ttl
+        with self._lock:
+            for tweet_id in [key for key, entry in self._memory.items() if entry[2] < cutoff]:
+                del self._memory[tweet_id]
+        if self.db is None:
+            return 0
+        removed = self.db.evict_sentiment_scores(cutoff)
+        logger.info(f"Sentiment cache eviction removed {removed} scores")
+        return removed
+
+    def stats(self):
+        """Hit/miss counters since the cache was created"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                'memory_items': len(self._memory),
+            }
 
 class SentimentAnalyzer:
-    def __init__(self):
+    def __init__(self, scoring_processes=None, db=None):
         # Twitter authentication
         self.client = tweepy.Client(
             bearer_token=config.TWITTER_BEARER_TOKEN,
@@ -21,6 +220,18 @@ class SentimentAnalyzer:
         # Create directory for charts if it doesn't exist
         if not os.path.exists('charts'):
             os.makedirs('charts')
+        # Optional worker processes for scoring large batches
+        if scoring_processes is None:
+            scoring_processes = config.SENTIMENT_SCORING_PROCESSES
+        self.scoring_pool = ScoringPool(scoring_processes) if scoring_processes else None
+        # Per-tweet scores shared across topics and runs
+        self.cache = SentimentCache(db)
+        # v1.1 client for trends, created on first use, and the per-WOEID
+        # trends cache: woeid -> (topics, monotonic fetch time)
+        self._trends_api = None
+        self._trends = {}
+        self._trends_refreshing = set()
+        self._trends_lock = threading.Lock()
     
     def clean_text(self, text):
         """Clean tweet text by removing links, special characters, etc."""
@@ -32,85 +243,339 @@ class SentimentAnalyzer:
         text = text.lower()
         return text
     
+    def clean_texts(self, texts):
+        """Clean a whole sample (list or Series) at once
+        
+        Output is identical to calling clean_text on each item. The sample
+        is joined into one string so the regex and character deletion run
+        once over the whole batch instead of three substitutions per tweet.
+        """
+        texts = [text or "" for text in texts]
+        if not texts:
+            return []
+        
+        joined = _BATCH_SEPARATOR.join(texts)
+        if joined.count(_BATCH_SEPARATOR) != len(texts) - 1:
+            # A tweet contains the separator itself
+            return [self.clean_text(text) for text in texts]
+        
+        joined = _URL_MENTION_PATTERN.sub('', joined).translate(_PUNCTUATION_TABLE).lower()
+        return joined.split(_BATCH_SEPARATOR)
+    
+    def score_texts(self, texts):
+        """Score cleaned texts in a batch; returns (polarity, subjectivity) arrays
+        
+        Matches TextBlob(text).sentiment for clean_text output, without
+        building a TextBlob per tweet. Large batches are sharded across
+        the scoring pool when one is configured.
+        """
+        if self.scoring_pool is not None:
+            return self.scoring_pool.score_many(texts)
+        return get_scorer().score_many(texts)
+    
+    def score_tweet_map(self, tweets):
+        """Score (tweet_id, text) pairs, reusing cached scores; returns {tweet_id: (polarity, subjectivity)}
+        
+        Only tweets missing from the cache are cleaned and scored. Tweets
+        whose cleaned text is empty are left out, as in clean_texts.
+        """
+        scores = self.cache.get_many([tweet_id for tweet_id, _ in tweets])
+        unseen = [(tweet_id, text) for tweet_id, text in tweets if tweet_id not in scores]
+        
+        if unseen:
+            clean = [(tweet_id, text) for (tweet_id, _), text
+                     in zip(unseen, self.clean_texts([text for _, text in unseen])) if text]
+            polarity, subjectivity = self.score_texts([text for _, text in clean])
+            fresh = {tweet_id: (p, s) for (tweet_id, _), p, s
+                     in zip(clean, polarity.tolist(), subjectivity.tolist())}
+            self.cache.put_many(fresh)
+            scores.update(fresh)
+        return scores
+    
+    def score_tweets(self, tweets):
+        """Score (tweet_id, text) pairs like score_tweet_map; returns (polarity, subjectivity) arrays"""
+        return _score_arrays(tweets, self.score_tweet_map(tweets))
+    
+    def close(self):
+        """Stop the scoring worker processes, if started"""
+        if self.scoring_pool is not None:
+            self.scoring_pool.shutdown()
+    
+    def _get_trends_api(self):
+        """Return the long-lived v1.1 API client used for trends"""
+        with self._trends_lock:
+            if self._trends_api is None:
+                auth = tweepy.OAuth1UserHandler(
+                    config.TWITTER_API_KEY, 
+                    config.TWITTER_API_SECRET,
+                    config.TWITTER_ACCESS_TOKEN,
+                    config.TWITTER_ACCESS_SECRET
+                )
+                self._trends_api = tweepy.API(auth, timeout=config.TRENDS_TIMEOUT)
+            return self._trends_api
+    
+    def _fetch_trending_topics(self, woeid):
+        """Call the trends endpoint and cache a non-empty result"""
+        trends = self._get_trends_api().get_place_trends(woeid)
+        topics = [trend['name'] for trend in trends[0]['trends'] if not trend['name'].startswith('#')][:5]
+        if topics:
+            with self._trends_lock:
+                self._trends[woeid] = (topics, time.monotonic())
+        return topics
+    
+    def _refresh_trending_topics(self, woeid):
+        try:
+            self._fetch_trending_topics(woeid)
+        except Exception as e:
+            logger.warning(f"Error refreshing trending topics, keeping the last list: {e}")
+        finally:
+            with self._trends_lock:
+                self._trends_refreshing.discard(woeid)
+    
     def get_trending_topics(self, woeid=1):
-        """Get trending topics for a location (default: worldwide)"""
+        """Get trending topics for a location (default: worldwide)
+        
+        Lists are cached per WOEID. Within TRENDS_CACHE_TTL_MINUTES the
+        cached list is returned; after that it is still returned at once
+        while a background thread fetches a new one, so a slow or failing
+        trends call serves the last good list. The hard-coded topics are
+        used only when no list has ever been fetched.
+        """
+        with self._trends_lock:
+            cached = self._trends.get(woeid)
+            if cached is not None:
+                topics, fetched_at = cached
+                expired = time.monotonic() - fetched_at >= config.TRENDS_CACHE_TTL_MINUTES * 60
+                if expired and woeid not in self._trends_refreshing:
+                    self._trends_refreshing.add(woeid)
+                    refresher = threading.Thread(target=self._refresh_trending_topics, args=(woeid,),
+                                                 name=f'trends-{woeid}')
+                    refresher.daemon = True
+                    refresher.start()
+                return list(topics)
+        
         try:
-            # Using API v1.1 for trends
-            auth = tweepy.OAuth1UserHandler(
-                config.TWITTER_API_KEY, 
-                config.TWITTER_API_SECRET,
-                config.TWITTER_ACCESS_TOKEN,
-                config.TWITTER_ACCESS_SECRET
-            )
-            api = tweepy.API(auth)
-            trends = api.get_place_trends(woeid)
-            return [trend['name'] for trend in trends[0]['trends'] if not trend['name'].startswith('#')][:5]
+            return list(self._fetch_trending_topics(woeid))
         except Exception as e:
             logger.error(f"Error getting trending topics: {e}")
-            return ["AI", "Python", "Machine Learning", "Data Science", "Technology"]
+            return list(FALLBACK_TOPICS)
+    
+    def iter_sample_pages(self, topic, count=None):
+        """Yield pages (lists of (tweet_id, text)) of a recent-tweet sample for a topic
+        
+        Pages are fetched on a background thread into a small bounded queue,
+        so the next request is in flight while the caller processes the
+        current page and at most a few pages are held in memory.
+        """
+        count = count or config.SENTIMENT_SAMPLE_SIZE
+        page_size = max(10, min(config.SENTIMENT_PAGE_SIZE, count))
+        pages = queue.Queue(maxsize=config.SENTIMENT_PREFETCH_PAGES)
+        stop = threading.Event()
+        
+        def put(item):
+            return _put_until_stopped(pages, item, stop)
+        
+        def produce():
+            try:
+                remaining = count
+                for response in tweepy.Paginator(
+                    self.client.search_recent_tweets,
+                    query=f"{topic} lang:en -is:retweet",
+                    max_results=page_size,
+                    limit=-(-count // page_size)
+                ):
+                    tweets = [(tweet.id, tweet.text) for tweet in (response.data or [])][:remaining]
+                    remaining -= len(tweets)
+                    if tweets and not put(tweets):
+                        return
+                    if remaining <= 0:
+                        break
+            except Exception as e:
+                put(e)
+                return
+            put(_DONE)
+        
+        producer = threading.Thread(target=produce, name=f'sample-{topic}')
+        producer.daemon = True
+        producer.start()
+        try:
+            while True:
+                item = pages.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
     
-    def analyze_topic_sentiment(self, topic, count=100):
-        """Analyze sentiment for a given topic"""
+    def analyze_topic_sentiment(self, topic, count=None):
+        """Analyze sentiment for a given topic over a sample of `count` recent tweets"""
         logger.info(f"Analyzing sentiment for topic: {topic}")
         
         try:
-            tweets = self.client.search_recent_tweets(
-                query=f"{topic} lang:en -is:retweet", 
-                max_results=count
-            ).data
+            # Clean and score each page while the next one downloads; only
+            # the scores are kept, so memory stays at a few pages of text
+            scorer = _SampleScorer(self)
+            for tweets in self.iter_sample_pages(topic, count):
+                scorer.add(topic, tweets)
             
-            if not tweets:
+            df = scorer.frames().get(topic)
+            if df is None:
                 logger.warning(f"No tweets found for topic: {topic}")
                 return None, None
-            
-            # Process tweets
-            data = []
-            for tweet in tweets:
-                clean_tweet = self.clean_text(tweet.text)
-                if clean_tweet:
-                    analysis = TextBlob(clean_tweet)
-                    polarity = analysis.sentiment.polarity
-                    subjectivity = analysis.sentiment.subjectivity
-                    data.append([tweet.text, clean_tweet, polarity, subjectivity])
-            
-            # Create DataFrame
-            df = pd.DataFrame(data, columns=['Tweet', 'Clean Tweet', 'Polarity', 'Subjectivity'])
-            
-            # Generate chart
-            chart_path = self.generate_sentiment_chart(df, topic)
-            
-            # Generate summary
-            sentiment_summary = self.generate_sentiment_summary(df, topic)
-            
-            return sentiment_summary, chart_path
+            return self.summarize_topic(df, topic)
             
         except Exception as e:
             logger.error(f"Error analyzing sentiment: {e}")
             return None, None
     
-    def generate_sentiment_chart(self, df, topic):
-        """Generate a sentiment distribution chart"""
+    def collect_topic_scores(self, topics, count=None, deadline=None):
+        """Sample and score several topics concurrently; returns {topic: DataFrame of scores}
+        
+        Every topic is fetched on its own thread, so requests for all topics
+        overlap, and pages from all of them are cleaned and scored by the
+        calling thread, as they arrive or in pooled batches. Collection stops after `deadline`
+        seconds; topics still downloading then keep the pages scored so far.
+        """
+        topics = list(dict.fromkeys(topics))
+        if not topics:
+            return {}
+        deadline = deadline if deadline is not None else config.SENTIMENT_TOPICS_DEADLINE
+        ends_at = time.monotonic() + deadline
+        pages = queue.Queue(maxsize=config.SENTIMENT_PREFETCH_PAGES * len(topics))
+        stop = threading.Event()
+        
+        def fetch(topic):
+            try:
+                for tweets in self.iter_sample_pages(topic, count):
+                    if not _put_until_stopped(pages, (topic, tweets), stop):
+                        return
+            except Exception as e:
+                logger.error(f"Error sampling tweets for {topic}: {e}")
+            _put_until_stopped(pages, (topic, _DONE), stop)
+        
+        for topic in topics:
+            fetcher = threading.Thread(target=fetch, args=(topic,), name=f'topic-{topic}')
+            fetcher.daemon = True
+            fetcher.start()
+        
+        scorer = _SampleScorer(self)
+        pending = set(topics)
+        try:
+            while pending:
+                remaining = ends_at - time.monotonic()
+                if remaining <= 0:
+                    logger.warning(f"Sentiment deadline reached, using partial samples for: {', '.join(sorted(pending))}")
+                    break
+                try:
+                    topic, tweets = pages.get(timeout=remaining)
+                except queue.Empty:
+                    continue
+                if tweets is _DONE:
+                    pending.discard(topic)
+                    continue
+                scorer.add(topic, tweets)
+        finally:
+            stop.set()
+        
+        return scorer.frames()
+    
+    def choose_topic(self, frames, strategy=None):
+        """Pick the topic to post from {topic: scores DataFrame}
+        
+        'decisive' prefers the largest absolute average polarity, 'largest'
+        the biggest sample. Samples below SENTIMENT_MIN_SAMPLE_SIZE are only
+        considered when no topic reaches it.
+        """
+        strategy = strategy or config.SENTIMENT_TOPIC_SELECTION
+        candidates = {topic: df for topic, df in frames.items()
+                      if len(df) >= config.SENTIMENT_MIN_SAMPLE_SIZE} or frames
+        if not candidates:
+            return None
+        
+        def decisiveness(topic):
+            return abs(candidates[topic]['Polarity'].mean())
+        
+        if strategy == 'largest':
+            return max(candidates, key=lambda topic: (len(candidates[topic]), decisiveness(topic)))
+        return max(candidates, key=lambda topic: (decisiveness(topic), len(candidates[topic])))
+    
+    def analyze_trending_topics(self, topics, count=None, deadline=None):
+        """Analyze all topics concurrently and summarize the best one
+        
+        Returns (topic, summary, chart_path), or (None, None, None) when no
+        topic produced a usable sample.
+        """
+        logger.info(f"Analyzing sentiment for topics: {', '.join(topics)}")
         try:
-            plt.figure(figsize=(10, 6))
-            plt.hist(df['Polarity'], bins=20, color='blue', alpha=0.7)
-            plt.axvline(x=df['Polarity'].mean(), color='red', linestyle='--', linewidth=2)
-            plt.title(f'Sentiment Distribution for "{topic}"')
-            plt.xlabel('Polarity (Negative → Positive)')
-            plt.ylabel('Number of Tweets')
-            
-            # Add some metrics
-            plt.annotate(f'Average: {df["Polarity"].mean():.2f}', 
-                        xy=(0.7, 0.9), xycoords='axes fraction')
-            plt.annotate(f'Tweets analyzed: {len(df)}', 
-                        xy=(0.7, 0.85), xycoords='axes fraction')
+            frames = self.collect_topic_scores(topics, count, deadline)
+            topic = self.choose_topic(frames)
+            if topic is None:
+                logger.warning("No tweets found for any trending topic")
+                return None, None, None
+            logger.info(f"Selected topic {topic} ({len(frames[topic])} tweets, "
+                        f"avg polarity {frames[topic]['Polarity'].mean():.2f})")
+            sentiment_summary, chart_path = self.summarize_topic(frames[topic], topic)
+            return topic, sentiment_summary, chart_path
+        except Exception as e:
+            logger.error(f"Error analyzing trending topics: {e}")
+            return None, None, None
+    
+    def _scores_frame(self, polarities, subjectivities):
+        """Build the scores DataFrame from per-page polarity/subjectivity arrays"""
+        if not polarities:
+            return pd.DataFrame({'Polarity': [], 'Subjectivity': []})
+        return pd.DataFrame({'Polarity': np.concatenate(polarities),
+                             'Subjectivity': np.concatenate(subjectivities)})
+    
+    def summarize_topic(self, df, topic):
+        """Render the chart and summary for a topic's scores; returns (summary, chart_path)"""
+        stats = self.cache.stats()
+        logger.info(f"Sentiment cache: {stats['memory_hits'] + stats['disk_hits']} hits, "
+                    f"{stats['misses']} misses ({stats['hit_rate']:.0%} hit rate so far)")
+        
+        # Start rendering the chart while the summary is built
+        chart_future = self.generate_sentiment_chart(df, topic, wait=False)
+        
+        # Generate summary
+        sentiment_summary = self.generate_sentiment_summary(df, topic)
+        
+        chart_path = None
+        if chart_future is not None:
+            try:
+                chart_path = chart_future.result()
+            except Exception as e:
+                logger.error(f"Error generating chart: {e}")
+        
+        return sentiment_summary, chart_path
+    
+    def generate_sentiment_chart(self, df, topic, wait=True):
+        """Generate a sentiment distribution chart
+        
+        Returns the chart filename, or a Future of it when `wait` is False.
+        """
+        try:
+            avg_polarity = df['Polarity'].mean()
             
-            # Save chart
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f'charts/sentiment_{topic.replace(" ", "_")}_{timestamp}.png'
-            plt.savefig(filename)
-            plt.close()
+            future = get_chart_cache().render({
+                'kind': 'hist',
+                'values': df['Polarity'].tolist(),
+                'bins': 20,
+                'color': 'blue',
+                'alpha': 0.7,
+                'mean_line': True,
+                'title': f'Sentiment Distribution for "{topic}"',
+                'xlabel': 'Polarity (Negative → Positive)',
+                'ylabel': 'Number of Tweets',
+                # Add some metrics
+                'annotations': [
+                    (f'Average: {avg_polarity:.2f}', (0.7, 0.9)),
+                    (f'Tweets analyzed: {len(df)}', (0.7, 0.85)),
+                ],
+            }, 'charts', f'sentiment_{topic.replace(" ", "_")}')
             
-            return filename
+            return future.result() if wait else future
         except Exception as e:
             logger.error(f"Error generating chart: {e}")
             return None
@@ -3,6 +3,7 @@ from unittest.mock import patch, MagicMock
 import os
 import sys
 import json
+import sqlite3
 from datetime import datetime
 
 # Make sure the bot modules are importable
@@ -12,6 +13,12 @@ import config
 from content_generator import ContentGenerator
 from sentiment import SentimentAnalyzer
 from database import TweetDatabase
+from persistence import WriteBehindWriter
+from archive import TweetArchive
+from analytics import TwitterAnalytics, EngagementRefreshPlanner, aggregate_rollups
+from charts import ChartRenderer, ChartCache
+from aggregates import QuantileSketch
+from scheduler import TweetScheduler
 from logger import logger
 
 class TestContentGenerator(unittest.TestCase):
@@ -68,6 +75,197 @@ class TestSentimentAnalyzer(unittest.TestCase):
         self.assertIsInstance(topics, list)
         self.assertTrue(all(isinstance(t, str) for t in topics))
         self.assertGreaterEqual(len(topics), 3)
+    
+    def test_trending_topics_cache_serves_stale_list(self):
+        """Test that trends are cached per WOEID and a failing refresh keeps the last list"""
+        import time
+        analyzer = SentimentAnalyzer()
+        api = MagicMock()
+        api.get_place_trends.return_value = [{'trends': [{'name': 'Rust'}, {'name': '#Tag'}, {'name': 'LLMs'}]}]
+        analyzer._trends_api = api
+
+        self.assertEqual(analyzer.get_trending_topics(), ['Rust', 'LLMs'])
+        self.assertEqual(analyzer.get_trending_topics(), ['Rust', 'LLMs'])
+        self.assertEqual(api.get_place_trends.call_count, 1)
+
+        # Once expired, the old list is served while a refresh runs; the refresh fails
+        api.get_place_trends.side_effect = Exception("API timeout")
+        analyzer._trends[1] = (['Rust', 'LLMs'], time.monotonic() - config.TRENDS_CACHE_TTL_MINUTES * 60)
+        self.assertEqual(analyzer.get_trending_topics(), ['Rust', 'LLMs'])
+        for _ in range(100):
+            if not analyzer._trends_refreshing:
+                break
+            time.sleep(0.01)
+        self.assertEqual(api.get_place_trends.call_count, 2)
+        self.assertEqual(analyzer.get_trending_topics(), ['Rust', 'LLMs'])
+
+        # Another location has no list yet, so it falls back to the defaults
+        self.assertIn("Python", analyzer.get_trending_topics(woeid=23424977))
+
+    def test_paginated_sample_is_pipelined_and_bounded(self):
+        """Test that large samples page through search results with a bounded prefetch"""
+        import tweepy
+        analyzer = SentimentAnalyzer()
+        progress = {'fetched': 0, 'scored': 0, 'max_ahead': 0}
+
+        def search_recent_tweets(query, max_results, next_token=None):
+            page = int(next_token or 0)
+            progress['fetched'] += 1
+            progress['max_ahead'] = max(progress['max_ahead'], progress['fetched'] - progress['scored'])
+            data = [MagicMock(id=page * max_results + i, text=f"Great news number {page * max_results + i}")
+                    for i in range(max_results)]
+            return tweepy.Response(data, {}, [], {'next_token': str(page + 1)})
+
+        score_texts = analyzer.score_texts
+        def counting_score_texts(texts):
+            progress['scored'] += 1
+            return score_texts(texts)
+
+        analyzer.client = MagicMock()
+        analyzer.client.search_recent_tweets = search_recent_tweets
+        analyzer.score_texts = counting_score_texts
+        analyzer.generate_sentiment_chart = MagicMock(return_value=None)
+
+        with patch('config.SENTIMENT_PAGE_SIZE', 100), patch('config.SENTIMENT_PREFETCH_PAGES', 2):
+            summary, _ = analyzer.analyze_topic_sentiment("AI", count=1450)
+
+        self.assertIn("Based on analysis of 1450 tweets", summary)
+        self.assertIn("strongly positive", summary)
+        self.assertEqual(progress['fetched'], 15)
+        # Queue of 2, one page being put and one being scored
+        self.assertLessEqual(progress['max_ahead'], 4)
+
+        # A failing request surfaces as a failed analysis
+        analyzer.client.search_recent_tweets = MagicMock(side_effect=Exception("API error"))
+        analyzer.client.search_recent_tweets.__name__ = 'search_recent_tweets'
+        self.assertEqual(analyzer.analyze_topic_sentiment("AI", count=300), (None, None))
+
+    def test_trending_topics_analyzed_concurrently_within_deadline(self):
+        """Test that topics are sampled in parallel and the best one is chosen"""
+        import time
+        import tweepy
+        analyzer = SentimentAnalyzer()
+        texts = {'Rust': "I love this great language", 'Java': "This is terrible and awful",
+                 'Go': "It compiles", 'Slow': "Amazing wonderful best news"}
+        pages = {'Rust': 4, 'Java': 3, 'Go': 4, 'Slow': 50}
+
+        def search_recent_tweets(query, max_results, next_token=None):
+            topic = query.split()[0]
+            page = int(next_token or 0)
+            time.sleep(0.5 if topic == 'Slow' else 0.05)
+            data = [MagicMock(id=hash((topic, page, i)), text=texts[topic]) for i in range(max_results)]
+            meta = {'next_token': str(page + 1)} if page + 1 < pages[topic] else {}
+            return tweepy.Response(data, {}, [], meta)
+
+        analyzer.client = MagicMock()
+        analyzer.client.search_recent_tweets = search_recent_tweets
+        analyzer.generate_sentiment_chart = MagicMock(return_value=None)
+
+        with patch('config.SENTIMENT_PAGE_SIZE', 100):
+            start = time.monotonic()
+            frames = analyzer.collect_topic_scores(['Rust', 'Java', 'Go', 'Slow'], count=1000, deadline=0.8)
+            elapsed = time.monotonic() - start
+
+        # Four pages at 50ms each run side by side, and the slow topic is cut off at the deadline
+        self.assertLess(elapsed, 1.2)
+        self.assertEqual({topic: len(df) for topic, df in frames.items()},
+                         {'Rust': 400, 'Java': 300, 'Go': 400, 'Slow': 100})
+        self.assertEqual(analyzer.choose_topic(frames, 'decisive'), 'Java')
+        self.assertEqual(analyzer.choose_topic(frames, 'largest'), 'Rust')
+        with patch('config.SENTIMENT_MIN_SAMPLE_SIZE', 200):
+            self.assertNotEqual(analyzer.choose_topic(frames, 'decisive'), 'Slow')
+
+        with patch('config.SENTIMENT_PAGE_SIZE', 100), patch('config.SENTIMENT_TOPIC_SELECTION', 'decisive'):
+            topic, summary, _ = analyzer.analyze_trending_topics(['Rust', 'Java', 'Go'], count=1000, deadline=5)
+        self.assertEqual(topic, 'Java')
+        self.assertIn("strongly negative", summary)
+
+    def test_scoring_pool_matches_in_process_scores(self):
+        """Test that sharded scoring returns the in-process scores in order"""
+        import numpy as np
+        from lexicon import ScoringPool, get_scorer
+        texts = ["great good day", "not bad at all", "", "very very sad", "python is fun"] * 11
+        expected = get_scorer().score_many(texts)
+
+        pool = ScoringPool(2, chunk_size=7, threshold=0)
+        try:
+            for actual, wanted in zip(pool.score_many(texts), expected):
+                np.testing.assert_array_equal(actual, wanted)
+        finally:
+            pool.shutdown()
+
+        # Below the threshold no workers are started
+        small = ScoringPool(2, threshold=1000)
+        small.score_many(texts)
+        self.assertIsNone(small._executor)
+
+    def test_topic_samples_reach_the_scoring_pool(self):
+        """Test that pages from several topics are pooled into batches large enough to shard"""
+        import tweepy
+        words = {'Rust': "great fast safe", 'Java': "slow and bad", 'Go': "simple tool"}
+
+        def search_recent_tweets(query, max_results, next_token=None):
+            topic = query.split()[0]
+            page = int(next_token or 0)
+            data = [MagicMock(id=hash((topic, page, i)), text=f"{words[topic]} {i % 7}") for i in range(max_results)]
+            return tweepy.Response(data, {}, [], {'next_token': str(page + 1)} if page < 2 else {})
+
+        frames = {}
+        with patch('config.SENTIMENT_PAGE_SIZE', 100), patch('config.SENTIMENT_PARALLEL_THRESHOLD', 250), \
+                patch('config.SENTIMENT_SCORING_CHUNK_SIZE', 100):
+            for processes in (0, 2):
+                analyzer = SentimentAnalyzer(scoring_processes=processes)
+                analyzer.client = MagicMock()
+                analyzer.client.search_recent_tweets = search_recent_tweets
+                calls = []
+                score_texts = analyzer.score_texts
+                analyzer.score_texts = lambda texts: calls.append(len(texts)) or score_texts(texts)
+                try:
+                    frames[processes] = analyzer.collect_topic_scores(list(words), count=300, deadline=30)
+                    if processes:
+                        self.assertIsNotNone(analyzer.scoring_pool._executor)
+                        self.assertTrue(all(size >= 250 for size in calls[:-1]))
+                    else:
+                        self.assertEqual(calls, [100] * 9)
+                finally:
+                    analyzer.close()
+
+        for topic in words:
+            self.assertEqual(frames[2][topic]['Polarity'].tolist(), frames[0][topic]['Polarity'].tolist())
+
+    def test_batch_cleaning_matches_clean_text(self):
+        """Fuzz test that clean_texts gives exactly clean_text's output"""
+        import random
+        analyzer = SentimentAnalyzer()
+        rng = random.Random(42)
+        pieces = ['@', '#', 'http', 'https', 'www', '://', '.', '/', ':', '_', 'a', 'Z', '7', ' ', '\n',
+                  'é', 'Σ', 'İ', '😀', "'", '!', 'HTTP', 'user', '\x1e']
+        for _ in range(200):
+            texts = [''.join(rng.choice(pieces) for _ in range(rng.randint(0, 25))) for _ in range(20)]
+            texts.append(None)
+            self.assertEqual(analyzer.clean_texts(texts), [analyzer.clean_text(text) for text in texts])
+        self.assertEqual(analyzer.clean_texts(["@userhttp://t.co/x Great #AI post!!"]), [" great ai post"])
+    
+    def test_batch_scores_match_textblob(self):
+        """Test that batch lexicon scoring matches TextBlob on cleaned text"""
+        from textblob import TextBlob
+        analyzer = SentimentAnalyzer()
+        raw = [
+            "This is a really great release!! http://t.co/x",
+            "not bad at all, @someone",
+            "I am not really happy with this #update",
+            "Absolutely terrible and very slow o_O",
+            "The model was released today",
+            "never a good idea... extremely disappointing",
+            "",
+        ]
+        texts = [analyzer.clean_text(text) for text in raw]
+        polarity, subjectivity = analyzer.score_texts(texts)
+        
+        for text, p, s in zip(texts, polarity, subjectivity):
+            expected = TextBlob(text).sentiment
+            self.assertAlmostEqual(p, expected.polarity, places=9, msg=text)
+            self.assertAlmostEqual(s, expected.subjectivity, places=9, msg=text)
 
 
 class TestDatabase(unittest.TestCase):
@@ -78,11 +276,41 @@ class TestDatabase(unittest.TestCase):
         self.db = TweetDatabase()
     
     def tearDown(self):
-        # Remove test database
+        # Remove test database (and its WAL sidecar files)
+        self.db.close()
         config.DB_FILENAME = self.original_db_filename
-        if os.path.exists("test_tweets.db"):
-            os.remove("test_tweets.db")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists("test_tweets.db" + suffix):
+                os.remove("test_tweets.db" + suffix)
     
+    def test_sentiment_cache_tiers_and_ttl(self):
+        """Test that cached tweet scores are reused from memory, then disk, until they expire"""
+        from datetime import timedelta
+        tweets = [(1, "What a great day"), (2, "not bad at all"), (3, "This is terrible")]
+        analyzer = SentimentAnalyzer(db=self.db)
+        expected = analyzer.score_tweets(tweets)
+        self.assertEqual(analyzer.cache.stats()['misses'], 3)
+
+        # Only the unseen tweet is cleaned and scored
+        scored = []
+        score_texts = analyzer.score_texts
+        analyzer.score_texts = lambda texts: scored.extend(texts) or score_texts(texts)
+        polarity, _ = analyzer.score_tweets(tweets + [(4, "Very happy")])
+        self.assertEqual(scored, ["very happy"])
+        self.assertEqual(polarity.tolist()[:3], expected[0].tolist())
+        self.assertEqual(analyzer.cache.stats()['memory_hits'], 3)
+
+        # A new process finds the scores on disk
+        restarted = SentimentAnalyzer(db=self.db)
+        cached = restarted.cache.get_many([1, 2, 3, 4])
+        self.assertEqual(restarted.cache.stats()['disk_hits'], 4)
+        self.assertEqual([cached[i][0] for i in (1, 2, 3)], expected[0].tolist())
+
+        # Expired scores are evicted and rescored
+        later = datetime.now() + timedelta(hours=config.SENTIMENT_CACHE_TTL_HOURS + 1)
+        self.assertEqual(restarted.cache.evict(now=later), 4)
+        self.assertEqual(SentimentAnalyzer(db=self.db).cache.get_many([1, 2, 3, 4]), {})
+
     def test_add_tweet(self):
         """Test adding a tweet to the database"""
         # Add a tweet
@@ -115,6 +343,603 @@ class TestDatabase(unittest.TestCase):
         tweets = self.db.get_tweet_history(limit=1)
         self.assertEqual(tweets[0]['engagement_likes'], likes)
         self.assertEqual(tweets[0]['engagement_retweets'], retweets)
+    
+    def test_update_engagement_many(self):
+        """Test bulk engagement updates in one transaction"""
+        for i in range(5):
+            self.db.add_tweet(str(100 + i), f"Tweet {i}", "test")
+        
+        updated = self.db.update_engagement_many([
+            (str(100 + i), i * 10, i) for i in range(5)
+        ] + [("missing", 1, 1)])
+        
+        self.assertEqual(updated, 5)
+        tweets = {t['tweet_id']: t for t in self.db.get_tweet_history(limit=10)}
+        self.assertEqual(tweets["103"]['engagement_likes'], 30)
+        self.assertEqual(tweets["103"]['engagement_retweets'], 3)
+    
+    def test_get_tweets_between(self):
+        """Test time-range queries with category filter and projection"""
+        conn = self.db._get_connection()
+        with conn:
+            conn.executemany("INSERT INTO tweets (tweet_id, content, category, post_time) VALUES (?, ?, ?, ?)", [
+                ("1", "old", "tech", "2024-01-01 10:00:00"),
+                ("2", "in range", "tech", "2024-01-05 10:00:00"),
+                ("3", "other category", "ai", "2024-01-06 10:00:00"),
+                ("4", "end is exclusive", "tech", "2024-01-08 00:00:00"),
+            ])
+        
+        start, end = datetime(2024, 1, 2), datetime(2024, 1, 8)
+        rows = self.db.get_tweets_between(start, end)
+        self.assertEqual([r['tweet_id'] for r in rows], ["2", "3"])
+        
+        columns = self.db.get_tweets_between(start, end, categories=["tech"],
+                                             columns=["tweet_id", "content"], columnar=True)
+        self.assertEqual(columns, {"tweet_id": ["2"], "content": ["in range"]})
+        
+        with self.assertRaises(ValueError):
+            self.db.get_tweets_between(start, end, columns=["content; DROP TABLE tweets"])
+    
+    def test_rollups_follow_inserts_and_updates(self):
+        """Test that daily rollups are maintained incrementally and can be rebuilt"""
+        self.db.add_tweet("1", "Tweet one", "tech")
+        self.db.add_tweet("2", "Tweet two", "tech")
+        self.db.add_tweet("3", "Tweet three", "ai")
+        self.db.update_engagement("1", 10, 2)
+        self.db.update_engagement_many([("2", 4, 0), ("3", 1, 1)])
+        
+        stats = {s['category']: s for s in self.db.get_category_stats()}
+        self.assertEqual(stats['tech']['tweet_count'], 2)
+        self.assertAlmostEqual(stats['tech']['avg_engagement'], 8.0)
+        self.assertAlmostEqual(stats['ai']['avg_engagement'], 2.0)
+        
+        today = datetime.now().date()
+        incremental = self.db.get_daily_rollups(today, today.replace(year=today.year + 1))
+        self.db.rebuild_rollups()
+        rebuilt = self.db.get_daily_rollups(today, today.replace(year=today.year + 1))
+        self.assertEqual(incremental, rebuilt)
+        self.assertEqual([r['total_likes'] for r in rebuilt], [1, 14])
+    
+    def test_engagement_snapshots_and_downsampling(self):
+        """Test engagement history capture, curves and retention downsampling"""
+        self.db.add_tweet("1234567890", "Test tweet content", "test")
+        self.db.update_engagement("1234567890", 7, 3)
+        
+        curves = self.db.get_engagement_curves(["1234567890", "42"])
+        self.assertEqual([point[1:] for point in curves["1234567890"]], [(7, 3)])
+        self.assertEqual(curves["42"], [])
+        
+        # Four snapshots an hour apart ten days ago collapse to one per day,
+        # four a minute apart two days ago collapse to one per hour
+        now = datetime(2024, 6, 20, 12, 0)
+        ten_days = int(datetime(2024, 6, 10, 8, 0).timestamp())
+        two_days = int(datetime(2024, 6, 18, 8, 0).timestamp())
+        conn = self.db._get_connection()
+        with conn:
+            conn.executemany("INSERT INTO engagement_snapshots VALUES (42, ?, ?)",
+                             [(ten_days + i * 3600, i) for i in range(4)] +
+                             [(two_days + i * 60, 10 + i) for i in range(4)])
+        
+        removed = self.db.compact_engagement_snapshots(now=now)
+        self.assertEqual(removed, 6)
+        likes = [point[1] for point in self.db.get_engagement_curves([42])["42"]]
+        self.assertEqual(likes, [3, 13])
+    
+    def test_duplicate_detection(self):
+        """Test normalized content and article URL duplicate checks"""
+        self.db.add_tweet("1", "Big News! https://example.com/a #TechNews", "tech",
+                          source_url="https://example.com/a")
+        
+        self.assertTrue(self.db.is_duplicate("big news https://t.co/xyz #Technology"))
+        self.assertTrue(self.db.is_duplicate("Other title", "https://example.com/a"))
+        self.assertFalse(self.db.is_duplicate("Bigger news", "https://example.com/b"))
+        
+        # The in-memory index is rebuilt from the table on startup
+        reopened = TweetDatabase()
+        self.assertTrue(reopened.is_duplicate("BIG NEWS"))
+        reopened.close()
+
+        # Sentiment posts name their topic only as a hashtag
+        import pandas as pd
+        analyzer = SentimentAnalyzer()
+        df = pd.DataFrame({'Polarity': [0.5, -0.1, 0.0]})
+        self.db.add_tweet("2", analyzer.generate_sentiment_summary(df, 'Python'), "sentiment")
+        self.assertTrue(self.db.is_duplicate(analyzer.generate_sentiment_summary(df, 'Python'), category="sentiment"))
+        self.assertFalse(self.db.is_duplicate(analyzer.generate_sentiment_summary(df, 'Rust'), category="sentiment"))
+
+    def test_posted_tweets_kept_on_fingerprint_conflict(self):
+        """Test that a tweet posted by another process with the same fingerprint is still stored"""
+        other = TweetDatabase()
+        self.db.add_tweet("1", "Same text https://example.com/a", "tech", source_url="https://example.com/a")
+
+        # The second process's fingerprint set predates the first insert
+        now = datetime.now()
+        inserted = other.add_tweets_many([("2", "Same text", "tech", now, "https://example.com/a"),
+                                          ("1", "Same text", "tech", now, None)])
+        other.close()
+        self.assertEqual(inserted, 1)
+
+        rows = {row['tweet_id']: row for row in self.db.get_tweets_between(
+            datetime(2000, 1, 1), datetime(2100, 1, 1), columns=['tweet_id', 'content_hash', 'source_url'])}
+        self.assertEqual(sorted(rows), ["1", "2"])
+        self.assertIsNone(rows["2"]['content_hash'])
+        self.assertIsNone(rows["2"]['source_url'])
+        self.assertEqual(rows["1"]['source_url'], "https://example.com/a")
+
+    def test_archive_export_is_incremental(self):
+        """Test month-partitioned archive export and windowed loading"""
+        import shutil
+        archive_dir = "test_archive"
+        self.addCleanup(shutil.rmtree, archive_dir, ignore_errors=True)
+        
+        self.db.add_tweet("1", "January tweet", "tech", post_time=datetime(2024, 1, 15, 9, 0))
+        self.db.add_tweet("2", "February tweet", "ai", post_time=datetime(2024, 2, 3, 9, 0))
+        self.db.add_tweet("3", "Late February tweet", "ai", post_time=datetime(2024, 2, 20, 9, 0))
+        # Stored with a fractional second, unlike the other February rows
+        self.db.add_tweet("4", "Early February tweet", "ai", post_time=datetime(2024, 2, 1, 8, 0, 0, 250000))
+        
+        archive = TweetArchive(archive_dir)
+        self.assertEqual(archive.export(self.db), 2)
+        self.assertEqual(archive.export(self.db), 0)
+        
+        self.db.update_engagement("2", 5, 1)
+        self.assertEqual(archive.export(self.db), 2)  # February tweets + this month's snapshots
+        
+        # Changes that cancel out in the month's totals still rewrite it
+        self.db.update_engagement("2", 4, 1)
+        self.db.update_engagement("3", 1, 0)
+        archive.export(self.db)
+        df = archive.read("tweets", start=datetime(2024, 2, 1), end=datetime(2024, 3, 1),
+                          columns=["tweet_id", "engagement_likes"])
+        self.assertEqual(dict(zip(df["tweet_id"], df["engagement_likes"])), {"4": 0, "2": 4, "3": 1})
+        
+        df = archive.read("tweets", start=datetime(2024, 2, 10), end=datetime(2024, 3, 1),
+                          columns=["tweet_id", "content"])
+        self.assertEqual(list(df["tweet_id"]), ["3"])
+        self.assertEqual(list(df.columns), ["tweet_id", "content"])
+        self.assertEqual(len(archive.partitions("tweets", start=datetime(2024, 2, 1))), 1)
+        # Date bounds, as the reporting code passes them
+        from datetime import date
+        self.assertEqual(len(archive.partitions("tweets", start=date(2024, 2, 1))), 1)
+        df = archive.read("tweets", start=date(2024, 2, 10), end=date(2024, 3, 1), columns=["tweet_id"])
+        self.assertEqual(list(df["tweet_id"]), ["3"])
+    
+    def test_connection_per_thread(self):
+        """Test that each thread gets its own WAL-mode connection"""
+        import threading
+        self.db.add_tweet("1234567890", "Test tweet content", "test")
+        
+        results = {}
+        def read_from_thread():
+            results['conn'] = self.db._get_connection()
+            results['tweets'] = self.db.get_tweet_history(limit=1)
+        
+        thread = threading.Thread(target=read_from_thread)
+        thread.start()
+        thread.join()
+        
+        self.assertIsNot(results['conn'], self.db._get_connection())
+        self.assertEqual(len(results['tweets']), 1)
+        journal_mode = self.db._get_connection().execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(journal_mode, "wal")
+
+    
+    def test_migrates_legacy_database(self):
+        """Test that a pre-migration database is upgraded in place"""
+        import sqlite3
+        from database import MIGRATIONS
+        self.db.close()
+        os.remove("test_tweets.db")
+        
+        # Build a database the way the original init_db did, with a duplicate row
+        conn = sqlite3.connect("test_tweets.db")
+        conn.execute('''
+        CREATE TABLE tweets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tweet_id TEXT,
+            content TEXT,
+            category TEXT,
+            post_time TIMESTAMP,
+            engagement_likes INTEGER DEFAULT 0,
+            engagement_retweets INTEGER DEFAULT 0
+        )
+        ''')
+        conn.execute("CREATE TABLE analytics (id INTEGER PRIMARY KEY AUTOINCREMENT, date DATE, posts_count INTEGER, avg_engagement REAL)")
+        conn.executemany("INSERT INTO tweets (tweet_id, content, category, post_time) VALUES (?, ?, ?, ?)", [
+            ("1", "first", "tech", "2024-01-01 10:00:00"),
+            ("1", "first again", "tech", "2024-01-01 10:00:01"),
+            ("2", "second", "ai", "2024-01-02 10:00:00"),
+        ])
+        conn.commit()
+        conn.close()
+        
+        self.db = TweetDatabase()
+        conn = self.db._get_connection()
+        self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], len(MIGRATIONS))
+        self.assertEqual([t['tweet_id'] for t in self.db.get_tweet_history()], ["2", "1"])
+        
+        plan = " ".join(row[3] for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM tweets WHERE tweet_id = ?", ("1",)))
+        self.assertIn("idx_tweets_tweet_id", plan)
+
+
+class TestAnalytics(unittest.TestCase):
+    def setUp(self):
+        self.original_db_filename = config.DB_FILENAME
+        config.DB_FILENAME = "test_analytics.db"
+        self.analytics = TwitterAnalytics()
+        self.analytics.client = MagicMock()
+    
+    def tearDown(self):
+        self.analytics.db.close()
+        config.DB_FILENAME = self.original_db_filename
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists("test_analytics.db" + suffix):
+                os.remove("test_analytics.db" + suffix)
+    
+    def test_aggregate_rollups_single_pass(self):
+        """Test that the one-pass aggregation matches per-metric groupbys"""
+        rollups = {
+            'date': ['2024-01-01', '2024-01-01', '2024-01-02', '2024-01-08', '2024-01-08'],
+            'category': ['ai', None, 'tech', 'ai', 'tech'],
+            'posts_count': [2, 1, 3, 1, 2],
+            'total_likes': [10, 1, 3, 20, 4],
+            'total_retweets': [2, 0, 1, 5, 0],
+        }
+        summary = aggregate_rollups(rollups)
+        
+        self.assertEqual(summary['total_tweets'], 9)
+        self.assertEqual(summary['total_engagement'], 46)
+        self.assertAlmostEqual(summary['avg_engagement'], 46 / 9)
+        self.assertEqual(summary['best_category'], 'ai')
+        self.assertEqual(summary['daily_counts'], [('2024-01-01', 3), ('2024-01-02', 3), ('2024-01-08', 3)])
+        self.assertEqual(summary['category_counts'], [('ai', 3), ('tech', 5)])
+        # 2024-01-01 and 2024-01-08 are Mondays
+        by_day = dict(summary['engagement_by_day'])
+        self.assertAlmostEqual(by_day['Monday'], (13 + 25 + 4) / 6)
+        self.assertAlmostEqual(by_day['Tuesday'], 4 / 3)
+        self.assertEqual(by_day['Sunday'], 0.0)
+        self.assertIsNone(aggregate_rollups({key: [] for key in rollups}))
+    
+    def test_streaming_history_aggregates(self):
+        """Test that chunked aggregation matches exact per-group figures"""
+        rows = [(str(5000 + i), f"Streamed tweet {i}", ['ai', 'tech', None][i % 3],
+                 datetime(2024, 1 + (i % 12), 1, 12), None) for i in range(60)]
+        self.analytics.db.add_tweets_many(rows)
+        self.analytics.db.update_engagement_many((str(5000 + i), i, i % 5) for i in range(60))
+        
+        with patch.object(config, 'STREAM_CHUNK_SIZE', 7):
+            by_category = self.analytics.aggregate_history(group_by='category')
+            by_quarter = self.analytics.aggregate_history(group_by='quarter')
+        
+        self.assertEqual(set(by_category), {'ai', 'tech', None})
+        ai = by_category['ai'].summary()
+        self.assertEqual(ai['tweets'], 20)
+        self.assertEqual(ai['total_engagement'], sum(i + i % 5 for i in range(0, 60, 3)))
+        self.assertEqual(ai['max_engagement'], 57 + 57 % 5)
+        self.assertEqual(sorted(by_quarter), ['2024-Q1', '2024-Q2', '2024-Q3', '2024-Q4'])
+        self.assertEqual(sum(group.count for group in by_quarter.values()), 60)
+        self.assertIn("2024-Q3: 15 tweets", self.analytics.generate_quarterly_report())
+
+    def test_quarterly_history_skips_untimed_tweets(self):
+        """Test that tweets without a post_time are left out of quarterly groups"""
+        self.analytics.db.add_tweets_many([("6000", "Timed tweet", "ai", datetime(2024, 5, 1, 12), None),
+                                           ("6001", "Untimed tweet", "ai", None, None)])
+
+        by_quarter = self.analytics.aggregate_history(group_by='quarter')
+        by_category = self.analytics.aggregate_history(group_by='category')
+
+        self.assertEqual({key: group.count for key, group in by_quarter.items()}, {'2024-Q2': 1})
+        self.assertEqual(by_category['ai'].count, 2)
+
+    def test_period_report_reuses_cached_day_partials(self):
+        """Test that only days whose rollups changed are recomputed"""
+        db = self.analytics.db
+        db.add_tweets_many((str(7000 + i), f"Period tweet {i}", ['ai', 'tech'][i % 2],
+                            datetime(2024, 3, 1 + i % 3, 9), None) for i in range(9))
+        db.update_engagement_many((str(7000 + i), 10 * i, 1) for i in range(9))
+        start, end = datetime(2024, 3, 1).date(), datetime(2024, 4, 1).date()
+        
+        with patch.object(self.analytics, '_compute_day_partials',
+                          wraps=self.analytics._compute_day_partials) as compute:
+            first = self.analytics.load_day_partials(start, end)
+            self.analytics.load_day_partials(start, end)
+            db.update_engagement('7004', 100, 0)
+            second = self.analytics.load_day_partials(start, end)
+        
+        self.assertEqual(sorted(first), ['2024-03-01', '2024-03-02', '2024-03-03'])
+        self.assertEqual([sorted(c.args[0]) for c in compute.call_args_list],
+                         [['2024-03-01', '2024-03-02', '2024-03-03'], ['2024-03-02']])
+        self.assertEqual(second['2024-03-02']['ai'].engagement.total, 100)
+        self.assertEqual(second['2024-03-01']['ai'].engagement.total, first['2024-03-01']['ai'].engagement.total)
+        
+        report = self.analytics.generate_period_report(start=start, end=end)
+        self.assertIn("Overall: 9 tweets", report)
+        self.assertIn("Best day: 2024-03-02", report)
+    
+    def test_best_posting_hours_from_slot_matrix(self):
+        """Test that the slot matrix tracks updates and ranks hours by shrunk engagement"""
+        db = self.analytics.db
+        # Mondays in January 2024: 1st, 8th, 15th, 22nd, 29th
+        rows, updates = [], []
+        for week, day in enumerate([1, 8, 15, 22, 29]):
+            for hour, likes in ((9, 50), (10, 40), (15, 5), (21, 30)):
+                tweet_id = f"{day}{hour:02d}"
+                rows.append((tweet_id, f"Slot tweet {tweet_id}", 'ml', datetime(2024, 1, day, hour), None))
+                updates.append((tweet_id, likes, 0))
+        db.add_tweets_many(rows)
+        db.update_engagement_many(updates)
+        
+        slots = {row['hour_of_week']: row for row in db.get_posting_slots('ml')}
+        self.assertEqual(sorted(slots), [9, 10, 15, 21])
+        self.assertEqual(slots[9]['total_likes'], 250)
+        
+        with patch.object(config, 'ADAPTIVE_SCHEDULE_MIN_GAP_HOURS', 3):
+            self.assertEqual(self.analytics.best_posting_hours('ml', 0, 2), [9, 21])
+            self.assertEqual(self.analytics.best_posting_hours('ml', 1, 2), [])
+        with patch.object(config, 'ADAPTIVE_SCHEDULE_MIN_POSTS', 100):
+            self.assertEqual(self.analytics.best_posting_hours('ml', 0, 2), [])
+    
+    def test_quantile_sketch_accuracy_and_merge(self):
+        """Test that merged sketches stay within their relative accuracy"""
+        values = list(range(1, 10001))
+        left, right = QuantileSketch(0.01), QuantileSketch(0.01)
+        left.add_many(values[::2])
+        right.add_many(values[1::2])
+        sketch = left.merge(right)
+        
+        self.assertEqual(sketch.count, 10000)
+        for q in (0.1, 0.5, 0.9, 0.99):
+            exact = values[int(q * 9999)]
+            self.assertLessEqual(abs(sketch.quantile(q) - exact) / exact, 0.01)
+    
+    def test_refresh_engagement_batches_lookups(self):
+        """Test that metrics are fetched 100 IDs per call and stored in bulk"""
+        tweet_ids = [str(1000 + i) for i in range(250)]
+        self.analytics.db.add_tweets_many(
+            (tweet_id, f"Tweet {tweet_id}", "test", datetime.now(), None) for tweet_id in tweet_ids)
+        
+        def get_tweets(ids, tweet_fields):
+            data = [MagicMock(id=int(i), public_metrics={'like_count': 3, 'retweet_count': 1}) for i in ids]
+            return MagicMock(data=data)
+        self.analytics.client.get_tweets.side_effect = get_tweets
+        
+        api_calls, updated = self.analytics.refresh_engagement(tweet_ids)
+        
+        self.assertEqual(api_calls, 3)
+        self.assertEqual(updated, 250)
+        self.assertEqual([len(c.kwargs['ids']) for c in self.analytics.client.get_tweets.call_args_list],
+                         [100, 100, 50])
+    
+    @patch('analytics.time.sleep')
+    def test_rate_limit_waits_for_reset(self, mock_sleep):
+        """Test that a 429 waits for the reset window and retries"""
+        import time
+        import tweepy
+        response = MagicMock(status_code=429, reason="Too Many Requests",
+                             headers={'x-rate-limit-reset': str(int(time.time()) + 30)})
+        response.json.return_value = {}
+        self.analytics.client.get_tweets.side_effect = [tweepy.TooManyRequests(response), MagicMock(data=[])]
+        
+        api_calls, updated = self.analytics.refresh_engagement(["1"])
+        
+        self.assertEqual(api_calls, 1)
+        mock_sleep.assert_called_once()
+        self.assertGreater(mock_sleep.call_args[0][0], 25)
+
+    @patch('analytics.time.sleep')
+    def test_planner_rate_limit_pauses_without_blocking(self, mock_sleep):
+        """Test that the refresh planner records a 429's reset instead of sleeping through it"""
+        import time
+        import tweepy
+        from datetime import timedelta
+        now = datetime.now()
+        self.analytics.db.add_tweets_many([("1", "Fresh tweet", "test", now - timedelta(minutes=5), None)])
+        response = MagicMock(status_code=429, reason="Too Many Requests",
+                             headers={'x-rate-limit-reset': str(int(time.time()) + 600)})
+        response.json.return_value = {}
+        self.analytics.client.get_tweets.side_effect = tweepy.TooManyRequests(response)
+        planner = EngagementRefreshPlanner(self.analytics, budget=5)
+
+        self.assertEqual(planner.run_once(now), 0)
+        mock_sleep.assert_not_called()
+        self.assertEqual(planner.calls_available(now + timedelta(minutes=5)), 0)
+
+        # After the reset the window's budget is back and the tweet is retried
+        self.analytics.client.get_tweets.side_effect = None
+        self.analytics.client.get_tweets.return_value = MagicMock(data=[])
+        later = now + timedelta(minutes=11)
+        self.assertEqual(planner.calls_available(later), 5)
+        self.assertEqual(planner.run_once(later), 1)
+
+    @patch('config.TWEET_LOOKUP_BATCH_SIZE', 2)
+    def test_planner_rate_limit_requeues_only_unfetched(self):
+        """Test that batches stored before a 429 count as refreshed and aren't retried at reset"""
+        import time
+        import tweepy
+        from datetime import timedelta
+        now = datetime.now()
+        self.analytics.db.add_tweets_many([(str(i), f"Fresh tweet {i}", "test", now - timedelta(minutes=5 + i), None)
+                                           for i in range(3)])
+        response = MagicMock(status_code=429, reason="Too Many Requests",
+                             headers={'x-rate-limit-reset': str(int(time.time()) + 600)})
+        response.json.return_value = {}
+        stored = [MagicMock(id=i, public_metrics={'like_count': 7, 'retweet_count': 1}) for i in range(2)]
+        self.analytics.client.get_tweets.side_effect = [MagicMock(data=stored), tweepy.TooManyRequests(response)]
+        planner = EngagementRefreshPlanner(self.analytics, budget=5)
+
+        self.assertEqual(planner.run_once(now), 2)
+        likes = {t['tweet_id']: t['engagement_likes'] for t in self.analytics.db.get_tweet_history(limit=10)}
+        self.assertEqual(likes, {'0': 7, '1': 7, '2': 0})
+
+        # Only the tweet the 429 cut off is due when the window resets
+        self.analytics.client.get_tweets.side_effect = None
+        self.analytics.client.get_tweets.return_value = MagicMock(data=[])
+        self.assertEqual(planner.run_once(now + timedelta(minutes=11)), 1)
+        self.assertEqual(self.analytics.client.get_tweets.call_args.kwargs['ids'], ['2'])
+
+    @patch('config.TWEET_LOOKUP_BATCH_SIZE', 2)
+    def test_refresh_planner_prefers_young_tweets_within_budget(self):
+        """Test that the planner refreshes young tweets first and respects its budget"""
+        from datetime import timedelta
+        now = datetime.now()
+        self.analytics.db.add_tweets_many([
+            ("1", "Old tweet", "test", now - timedelta(days=20), None),
+            ("2", "New tweet", "test", now - timedelta(hours=1), None),
+            ("3", "Newer tweet", "test", now - timedelta(minutes=30), None),
+        ])
+        self.analytics.refresh_engagement = MagicMock(return_value=(1, 2))
+        planner = EngagementRefreshPlanner(self.analytics, budget=1)
+        
+        self.assertEqual(planner.run_once(now), 2)
+        self.assertEqual(sorted(self.analytics.refresh_engagement.call_args[0][0]), ["2", "3"])
+        
+        # Budget for this 15-minute window is spent
+        self.assertEqual(planner.run_once(now + timedelta(minutes=1)), 0)
+        self.analytics.refresh_engagement.assert_called_once()
+        
+        self.assertLess(planner.refresh_interval(timedelta(hours=1)),
+                        planner.refresh_interval(timedelta(days=5)))
+
+
+class TestTweetScheduler(unittest.TestCase):
+    def tearDown(self):
+        import schedule
+        schedule.clear()
+    
+    @patch.object(config, 'POSTING_SCHEDULE', {'ml': '12:00', 'interview': '10:00'})
+    @patch.object(config, 'ADAPTIVE_SCHEDULE', True)
+    def test_adaptive_schedule_uses_best_hours_with_fixed_fallback(self):
+        """Test that adaptive mode posts at model hours and falls back to fixed times"""
+        import schedule
+        bot = MagicMock()
+        bot.analytics.best_posting_hours.side_effect = lambda category, weekday, count: [8] if category == 'ml' and weekday < 5 else []
+        scheduler = TweetScheduler(bot)
+        scheduler.setup_schedule()
+        
+        posts = schedule.get_jobs('posts')
+        slots = sorted((job.start_day, job.at_time.hour) for job in posts)
+        self.assertEqual(len(posts), 8)
+        self.assertIn(('monday', 8), slots)
+        self.assertIn(('saturday', 12), slots)
+        self.assertIn(('monday', 10), slots)
+        
+        bot.analytics.best_posting_hours.side_effect = lambda category, weekday, count: [19]
+        scheduler.reschedule_posts()
+        self.assertEqual({job.at_time.hour for job in schedule.get_jobs('posts')}, {19})
+        self.assertEqual(len(schedule.get_jobs('posts')), 8)
+
+
+class TestChartRenderer(unittest.TestCase):
+    def setUp(self):
+        self.paths = []
+    
+    def tearDown(self):
+        for path in self.paths:
+            if os.path.exists(path):
+                os.remove(path)
+    
+    def test_renders_each_chart_kind_inline(self):
+        """Test bar, pie and histogram specs render to PNG files"""
+        renderer = ChartRenderer(use_processes=False)
+        specs = [
+            {'kind': 'bar', 'labels': ['a', 'b'], 'values': [1, 2], 'title': 'Bar', 'rotate_labels': 45},
+            {'kind': 'pie', 'labels': ['a', 'b'], 'values': [1, 2], 'title': 'Pie'},
+            {'kind': 'hist', 'values': [-0.5, 0.0, 0.2, 0.4], 'mean_line': True,
+             'annotations': [('Average: 0.03', (0.7, 0.9))], 'title': 'Hist'},
+        ]
+        for i, spec in enumerate(specs):
+            self.paths.append(f"test_chart_{i}.png")
+            self.assertEqual(renderer.submit(spec, self.paths[-1]).result(), self.paths[-1])
+            self.assertGreater(os.path.getsize(self.paths[-1]), 0)
+    
+    def test_renders_in_worker_processes(self):
+        """Test that charts render in the process pool and return futures"""
+        renderer = ChartRenderer(max_workers=2)
+        self.paths = ["test_chart_pool_0.png", "test_chart_pool_1.png"]
+        futures = [renderer.submit({'kind': 'bar', 'labels': ['x'], 'values': [i]}, path)
+                   for i, path in enumerate(self.paths)]
+        self.assertEqual([f.result(timeout=60) for f in futures], self.paths)
+        renderer.shutdown()
+    
+    def test_chart_cache_reuses_and_evicts(self):
+        """Test that unchanged specs reuse the cached file and old files are evicted"""
+        import shutil
+        import time
+        cache_dir = "test_chart_cache"
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        renderer = MagicMock(wraps=ChartRenderer(use_processes=False))
+        cache = ChartCache(renderer, max_bytes=10**9, max_age_days=30, directories=[cache_dir])
+        spec = {'kind': 'bar', 'labels': ['a'], 'values': [1]}
+        
+        first = cache.render(spec, cache_dir, 'chart').result()
+        second = cache.render(dict(spec), cache_dir, 'chart').result()
+        changed = cache.render({**spec, 'values': [2]}, cache_dir, 'chart').result()
+        
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, changed)
+        self.assertEqual(renderer.submit.call_count, 2)
+        
+        # Age out the first chart, then squeeze the size limit below one file
+        old = time.time() - 40 * 86400
+        os.utime(first, (old, old))
+        self.assertEqual(cache.evict(), 1)
+        self.assertFalse(os.path.exists(first))
+        cache.max_bytes = 1
+        self.assertEqual(cache.evict(), 1)
+        self.assertEqual(os.listdir(cache_dir), [])
+
+
+class TestWriteBehindWriter(unittest.TestCase):
+    def setUp(self):
+        self.db = TweetDatabase("test_writer.db")
+        self.spill_file = "test_pending_tweets.jsonl"
+    
+    def tearDown(self):
+        self.db.close()
+        for path in ("test_writer.db", "test_writer.db-wal", "test_writer.db-shm", self.spill_file):
+            if os.path.exists(path):
+                os.remove(path)
+    
+    def test_flushes_on_close(self):
+        """Test that queued tweets are written and the spill file emptied on close"""
+        writer = WriteBehindWriter(self.db, spill_file=self.spill_file, flush_interval=0.05)
+        for i in range(5):
+            writer.enqueue(str(i), f"Tweet {i}", "test")
+        writer.close()
+        
+        self.assertEqual(len(self.db.get_tweet_history(limit=10)), 5)
+        self.assertEqual(os.path.getsize(self.spill_file), 0)
+    
+    def test_replays_spill_file_on_startup(self):
+        """Test that records left behind by a crash are replayed exactly once"""
+        record = {"tweet_id": "99", "content": "Survived a crash", "category": "test",
+                  "post_time": "2024-01-01 10:00:00"}
+        with open(self.spill_file, "w") as f:
+            f.write(json.dumps(record) + "\n")
+            f.write(json.dumps(record) + "\n")
+            f.write('{"tweet_id": "torn')
+        
+        writer = WriteBehindWriter(self.db, spill_file=self.spill_file, flush_interval=0.05)
+        writer.close()
+        
+        tweets = self.db.get_tweet_history(limit=10)
+        self.assertEqual([t['tweet_id'] for t in tweets], ["99"])
+
+    def test_failed_batches_stay_in_spill_file(self):
+        """Test that a batch that keeps failing gives up and is replayed on the next startup"""
+        with patch.object(self.db, 'add_tweets_many', side_effect=sqlite3.OperationalError("locked")) as add:
+            writer = WriteBehindWriter(self.db, spill_file=self.spill_file, flush_interval=0.01, max_retries=2)
+            writer.enqueue("1", "Tweet 1", "test")
+            writer.close()
+
+        self.assertFalse(writer._thread.is_alive())
+        self.assertEqual(add.call_count, 2)
+        with open(self.spill_file) as f:
+            self.assertEqual(len(f.readlines()), 1)
+
+        WriteBehindWriter(self.db, spill_file=self.spill_file, flush_interval=0.05).close()
+        self.assertEqual([t['tweet_id'] for t in self.db.get_tweet_history(limit=10)], ["1"])
 
 
 if __name__ == '__main__':